@@ -0,0 +1,52 @@
+import re
+from email.utils import getaddresses
+from functools import lru_cache
+
+import config
+
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+MAILTO_PATTERN = re.compile(r"mailto:([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})")
+# Markdown hyperlinks: [text](mailto:email@example.com)
+MARKDOWN_LINK_PATTERN = re.compile(r"\[[^\]]*\]\(mailto:([^)\s]+)\)")
+
+
+@lru_cache(maxsize=config.ADDRESS_CACHE_SIZE)
+def normalize_address(address):
+    """Return a single address stripped of mailto, brackets and whitespace, lowercased"""
+    if not address:
+        return ""
+    mailto_match = MAILTO_PATTERN.search(address)
+    if mailto_match:
+        address = mailto_match.group(1)
+    address = address.strip().strip("<>[]()").replace(" ", "").replace("\n", "")
+    address = address.replace("mailto:", "")
+    return address.lower()
+
+
+@lru_cache(maxsize=config.ADDRESS_CACHE_SIZE)
+def is_valid_address(address):
+    """Check a normalized address against the email pattern"""
+    return EMAIL_PATTERN.match(address) is not None
+
+
+@lru_cache(maxsize=config.ADDRESS_CACHE_SIZE)
+def _parse_header(header):
+    header = MARKDOWN_LINK_PATTERN.sub(r"\1", header)
+    recipients = []
+    for _, address in getaddresses([header]):
+        address = normalize_address(address)
+        if address and address not in recipients:
+            recipients.append(address)
+    return tuple(recipients)
+
+
+def parse_recipients(header):
+    """Split an address header such as '"A" <a@x.com>, b@y.com' into normalized addresses"""
+    if not header:
+        return []
+    return list(_parse_header(header))
+
+
+def address_domain(address):
+    """Return the domain part of a normalized address"""
+    return address.rpartition("@")[2]
@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import threading
+
+# Seconds per call assumed for methods with no recorded history yet
+DEFAULT_LATENCY = {
+    "messages.list": 0.3,
+    "messages.get": 0.25,
+    "messages.attachments.get": 0.4,
+    "messages.send": 0.8,
+    "drafts.create": 0.6,
+    "drafts.send": 0.8,
+}
+
+
+def batch_key(method):
+    """Metrics key for calls of method made inside a batch HTTP request"""
+    return f"{method}[batch]"
+
+
+def base_method(key):
+    """API method a metrics key was recorded for, without any batch suffix"""
+    return key.split("[", 1)[0]
+
+
+class ApiMetrics:
+    """Per-method call counts and latencies, persisted across runs.
+
+    Stats from earlier runs are loaded from path and new observations are
+    added to them, so the averages used for run estimates improve over time.
+    Calls made by this process are also counted separately in session_calls.
+    Calls made inside batch requests are kept under their own batch_key, as
+    their per-call time is the batch round trip shared out among them.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self.stats = {}
+        self.session_calls = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.stats = json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Could not read API metrics from {path}: {e}")
+
+    def record(self, method, seconds, calls=1):
+        """Add the time taken by `calls` calls of method"""
+        with self._lock:
+            entry = self.stats.setdefault(
+                method, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            entry["count"] += calls
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds / calls)
+            self.session_calls[method] = self.session_calls.get(method, 0) + calls
+
+    def mean_latency(self, method):
+        """Average seconds per call, falling back to DEFAULT_LATENCY"""
+        with self._lock:
+            entry = self.stats.get(method)
+            if entry and entry["count"]:
+                return entry["total_seconds"] / entry["count"]
+        return DEFAULT_LATENCY.get(base_method(method), 0.5)
+
+    def has_history(self, method):
+        with self._lock:
+            return bool(self.stats.get(method, {}).get("count"))
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self.stats, indent=2, sort_keys=True)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Replace atomically so a crash never leaves half a file behind
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            self.logger.error(f"Could not save API metrics to {self.path}: {e}")
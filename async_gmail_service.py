@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+import config
+from quota_limiter import QUOTA_COSTS
+
+GMAIL_API_URL = "https://gmail.googleapis.com/gmail/v1/users/me"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class AsyncGmailService:
+    """asyncio counterpart of GmailService built on aiohttp.
+
+    Shares the credentials, token refresh and quota limiter of an
+    authenticated GmailService, and caps open connections so hundreds of
+    requests can be in flight from a single event loop. Methods mirror the
+    sync ones: errors are logged and None (or an empty list) is returned.
+    Use as an async context manager.
+    """
+
+    def __init__(self, gmail_service, max_connections=100):
+        self.gmail_service = gmail_service
+        self.transport = gmail_service.transport
+        self.quota_limiter = gmail_service.quota_limiter
+        self.metrics = gmail_service.metrics
+        self.max_connections = max_connections
+        self.session = None
+        self.logger = logging.getLogger(__name__)
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=aiohttp.ClientTimeout(total=config.HTTP_TIMEOUT),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.session.close()
+
+    async def _request(self, http_method, path, quota_method, params=None, body=None):
+        await self.quota_limiter.acquire_async(QUOTA_COSTS[quota_method])
+        for attempt in range(config.REQUEST_MAX_RETRIES + 1):
+            if self.transport.needs_refresh():
+                # Refresh runs under the transport's lock, off the event loop
+                await asyncio.to_thread(self.transport.ensure_fresh)
+            headers = {"Authorization": f"Bearer {self.transport.credentials.token}"}
+            started = time.monotonic()
+            try:
+                async with self.session.request(
+                    http_method,
+                    f"{GMAIL_API_URL}/{path}",
+                    params=params,
+                    json=body,
+                    headers=headers,
+                ) as response:
+                    if response.status < 400:
+                        result = await response.json()
+                        self.metrics.record(quota_method, time.monotonic() - started)
+                        return result
+                    error = f"HTTP {response.status}: {await response.text()}"
+                    if response.status not in RETRY_STATUSES:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message=error,
+                        )
+            except asyncio.TimeoutError:
+                error = "request timed out"
+            except aiohttp.ClientConnectionError as e:
+                error = str(e)
+            if attempt < config.REQUEST_MAX_RETRIES:
+                await asyncio.sleep(2**attempt)
+        raise aiohttp.ClientError(error)
+
+    async def search_messages(self, query, max_results=500):
+        messages = []
+        page_token = None
+        try:
+            while len(messages) < max_results:
+                params = {"q": query, "maxResults": min(500, max_results - len(messages))}
+                if page_token:
+                    params["pageToken"] = page_token
+                response = await self._request(
+                    "GET", "messages", "messages.list", params=params
+                )
+                messages.extend(response.get("messages", []))
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    break
+            self.logger.info(f"Found {len(messages)} messages matching query: {query}")
+            return messages
+        except aiohttp.ClientError as error:
+            self.logger.error(f"An error occurred while searching: {error}")
+            return []
+
+    async def get_message(self, message_id, format="full"):
+        try:
+            return await self._request(
+                "GET",
+                f"messages/{message_id}",
+                "messages.get",
+                params={"format": format},
+            )
+        except aiohttp.ClientError as error:
+            self.logger.error(
+                f"An error occurred while getting message {message_id}: {error}"
+            )
+            return None
+
+    async def get_attachment(self, message_id, attachment_id):
+        """Get attachment data from a message"""
+        try:
+            attachment = await self._request(
+                "GET",
+                f"messages/{message_id}/attachments/{attachment_id}",
+                "messages.attachments.get",
+            )
+            self.logger.info(
+                f"Retrieved attachment {attachment_id} from message {message_id}"
+            )
+            return attachment
+        except aiohttp.ClientError as error:
+            self.logger.error(
+                f"An error occurred while getting attachment {attachment_id}: {error}"
+            )
+            return None
+
+    async def create_draft(self, message_body):
+        """Create a draft message"""
+        if "spool_path" in message_body:
+            # Resumable uploads stay on the sync client
+            return await asyncio.to_thread(self.gmail_service.create_draft, message_body)
+        try:
+            draft = await self._request(
+                "POST", "drafts", "drafts.create", body={"message": message_body}
+            )
+            self.logger.info(f"Draft created successfully. ID: {draft['id']}")
+            return draft
+        except aiohttp.ClientError as error:
+            self.logger.error(f"An error occurred while creating draft: {error}")
+            return None
+
+    async def send_message(self, message_body):
+        if "spool_path" in message_body:
+            # Resumable uploads stay on the sync client
+            return await asyncio.to_thread(self.gmail_service.send_message, message_body)
+        try:
+            message = await self._request(
+                "POST", "messages/send", "messages.send", body=message_body
+            )
+            self.logger.info(f"Message sent successfully. ID: {message['id']}")
+            return message
+        except aiohttp.ClientError as error:
+            self.logger.error(f"An error occurred while sending message: {error}")
+            return None
@@ -29,6 +29,17 @@ JOB_KEYWORDS = [
     "interview",
 ]
 
+# Phrases in the body that mark a job application
+JOB_PATTERNS = [
+    "dear hiring manager",
+    "dear recruiter",
+    "i am writing to apply",
+    "application for",
+    "interested in the position",
+    "attached resume",
+    "cover letter",
+]
+
 RESEND_PREFIX = "Resending:"
 RESEND_MESSAGE = """Resending this application in case it was missed. Kindly confirm receipt. Thank you!\n\n---Original Message---\n"""
 
@@ -41,3 +52,83 @@ AUTO_EXCLUDE_AFTER_SEND = os.getenv("AUTO_EXCLUDE_AFTER_SEND", "True").lower() =
 MAX_EMAILS_PER_RECIPIENT = int(os.getenv("MAX_EMAILS_PER_RECIPIENT", "2"))
 MAX_EMAILS_PER_RUN = int(os.getenv("MAX_EMAILS_PER_RUN", "200"))
 SEND_DELAY = float(os.getenv("SEND_DELAY", "2.0"))
+
+# Streaming mode processes search results page by page and releases each message after use
+STREAMING_MODE = os.getenv("STREAMING_MODE", "False").lower() == "true"
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "100"))
+MEMORY_BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", "512"))
+
+# Messages whose attachments exceed this size are spooled to disk and sent with a resumable upload
+LARGE_MESSAGE_THRESHOLD_MB = float(os.getenv("LARGE_MESSAGE_THRESHOLD_MB", "5"))
+UPLOAD_CHUNK_SIZE_MB = int(os.getenv("UPLOAD_CHUNK_SIZE_MB", "5"))
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "5"))
+
+# Number of parsed and validated addresses kept in memory
+ADDRESS_CACHE_SIZE = int(os.getenv("ADDRESS_CACHE_SIZE", "4096"))
+
+# Sharded search lists date windows of the sent folder concurrently
+SHARDED_SEARCH = os.getenv("SHARDED_SEARCH", "False").lower() == "true"
+SEARCH_START_DATE = os.getenv("SEARCH_START_DATE", "2004-04-01")
+SEARCH_SHARD_DAYS = float(os.getenv("SEARCH_SHARD_DAYS", "90"))
+SEARCH_SHARD_LIMIT = int(os.getenv("SEARCH_SHARD_LIMIT", "500"))
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "8"))
+SEARCH_NEWEST_FIRST = os.getenv("SEARCH_NEWEST_FIRST", "True").lower() == "true"
+
+# "full" walks Gmail's JSON part tree; "raw" downloads the original message and parses it locally
+FETCH_FORMAT = os.getenv("FETCH_FORMAT", "full").lower()
+
+# Batch writes group draft creation and sends into batch HTTP requests
+BATCH_WRITES = os.getenv("BATCH_WRITES", "False").lower() == "true"
+BATCH_WRITE_SIZE = int(os.getenv("BATCH_WRITE_SIZE", "50"))
+
+# Memory reserved for already-encoded attachment parts reused across resends
+MIME_PART_CACHE_MB = float(os.getenv("MIME_PART_CACHE_MB", "64"))
+
+# Access tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+
+# Async mode drives all Gmail calls from one event loop under the shared quota limiter
+ASYNC_MODE = os.getenv("ASYNC_MODE", "False").lower() == "true"
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "200"))
+ASYNC_MAX_CONNECTIONS = int(os.getenv("ASYNC_MAX_CONNECTIONS", "100"))
+REQUEST_MAX_RETRIES = int(os.getenv("REQUEST_MAX_RETRIES", "5"))
+QUOTA_UNITS_PER_SECOND = float(os.getenv("QUOTA_UNITS_PER_SECOND", "250"))
+
+# Shared SQLite work queue that lets several workers split one run (empty to disable)
+WORK_QUEUE_DB = os.getenv("WORK_QUEUE_DB", "")
+WORK_QUEUE_LEASE_SECONDS = int(os.getenv("WORK_QUEUE_LEASE_SECONDS", "300"))
+WORK_QUEUE_BATCH_SIZE = int(os.getenv("WORK_QUEUE_BATCH_SIZE", "20"))
+WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "3"))
+
+# Per-domain scheduler interleaves recipient domains so no company receives a burst
+DOMAIN_SCHEDULER = os.getenv("DOMAIN_SCHEDULER", "False").lower() == "true"
+DOMAIN_MIN_INTERVAL = float(os.getenv("DOMAIN_MIN_INTERVAL", "30"))
+DOMAIN_CONCURRENCY = int(os.getenv("DOMAIN_CONCURRENCY", "1"))
+SEND_WORKERS = int(os.getenv("SEND_WORKERS", "4"))
+DOMAIN_MAX_PENDING = int(os.getenv("DOMAIN_MAX_PENDING", "100"))
+
+# Ranking scores a larger candidate pool and spends the run on the best MAX_EMAILS_PER_RUN
+RANK_CANDIDATES = os.getenv("RANK_CANDIDATES", "False").lower() == "true"
+RANK_POOL_SIZE = int(os.getenv("RANK_POOL_SIZE", "2000"))
+SCORE_SUBJECT_WEIGHT = float(os.getenv("SCORE_SUBJECT_WEIGHT", "2.0"))
+SCORE_BODY_WEIGHT = float(os.getenv("SCORE_BODY_WEIGHT", "1.0"))
+SCORE_PATTERN_WEIGHT = float(os.getenv("SCORE_PATTERN_WEIGHT", "1.5"))
+SCORE_AGE_WEIGHT = float(os.getenv("SCORE_AGE_WEIGHT", "2.0"))
+SCORE_AGE_PEAK_DAYS = float(os.getenv("SCORE_AGE_PEAK_DAYS", "14"))
+SCORE_AGE_HALF_LIFE_DAYS = float(os.getenv("SCORE_AGE_HALF_LIFE_DAYS", "30"))
+
+# Per-method API latencies recorded by every run and used by --estimate
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join("logs", "api_metrics.json"))
+DAILY_SEND_LIMIT = int(os.getenv("DAILY_SEND_LIMIT", "500"))
+DAILY_QUOTA_UNITS = int(os.getenv("DAILY_QUOTA_UNITS", "1000000000"))
+
+# HTML-only bodies are converted to at most this many characters of text (0 for no limit)
+HTML_BODY_CHAR_BUDGET = int(os.getenv("HTML_BODY_CHAR_BUDGET", "50000"))
+
+# Local ledger of every resend sent or drafted (empty to disable)
+SEND_LEDGER_DB = os.getenv("SEND_LEDGER_DB", "")
+RESEND_COOLDOWN_DAYS = float(os.getenv("RESEND_COOLDOWN_DAYS", "0"))
+
+# Worker processes that decode and encode attachments when building resends (0 to build in-process)
+MIME_BUILD_PROCESSES = int(os.getenv("MIME_BUILD_PROCESSES", "0"))
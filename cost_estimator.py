@@ -0,0 +1,198 @@
+import logging
+import math
+from collections import Counter
+
+import config
+from address_utils import address_domain
+from api_metrics import base_method, batch_key
+from quota_limiter import QUOTA_COSTS
+
+# Headers, snippet and the part tree of a message without any body data
+ESTIMATE_FIELDS = (
+    "id,snippet,internalDate,payload(headers,"
+    "parts(filename,body/attachmentId,"
+    "parts(filename,body/attachmentId,"
+    "parts(filename,body/attachmentId))))"
+)
+
+
+def count_attachments(payload):
+    """Count parts downloaded separately through messages.attachments.get"""
+    count = 0
+    for part in payload.get("parts", []):
+        if part.get("filename") and part.get("body", {}).get("attachmentId"):
+            count += 1
+        count += count_attachments(part)
+    return count
+
+
+class CostEstimator:
+    """Project the quota units and wall time a resend run would use.
+
+    Candidates are fetched once as metadata and put through the same
+    job-application, validation and exclusion filters as a real run, and the
+    calls each later stage would make are counted: the full fetch per
+    message, a sent-folder search each time a recipient is checked (only the
+    first time per address with a send ledger, which remembers the count),
+    attachment downloads and one write per recipient. Per-recipient limits
+    are not checked, so write counts are an upper bound. The body filter
+    only sees the snippet Gmail returns with the metadata.
+
+    Times are projected from the latencies in ApiMetrics for a sequential
+    run, plus the configured send pacing, and never less than the quota
+    limiter allows.
+    """
+
+    def __init__(
+        self, gmail_service, message_handler, excluded_emails, send_ledger=None
+    ):
+        self.gmail_service = gmail_service
+        self.message_handler = message_handler
+        self.excluded_emails = excluded_emails
+        self.send_ledger = send_ledger
+        self.metrics = gmail_service.metrics
+        self.logger = logging.getLogger(__name__)
+
+    def estimate(self, messages, use_drafts=False):
+        """Return the per-stage projection for a list of message stubs"""
+        # Discovery has already run through the real pipeline; its calls count too
+        discovery_calls = dict(self.metrics.session_calls)
+        message_ids = [message["id"] for message in messages]
+        metadata = self.gmail_service.get_messages_metadata(
+            message_ids, format="full", fields=ESTIMATE_FIELDS
+        )
+
+        job_messages = 0
+        recipient_checks = 0
+        attachment_downloads = 0
+        writes_per_domain = Counter()
+        counted = set()
+        processed = set()
+        for message_id in message_ids:
+            message = metadata.get(message_id)
+            if not message:
+                continue
+            payload = message.get("payload", {})
+            headers = {
+                header["name"].lower(): header["value"]
+                for header in payload.get("headers", [])
+            }
+            subject = headers.get("subject", "")
+            message_data = {"subject": subject, "body": message.get("snippet", "")}
+            if not self.message_handler.is_job_application(message_data):
+                continue
+            job_messages += 1
+            attachments = count_attachments(payload)
+            for recipient in self.message_handler.parse_recipients(headers.get("to", "")):
+                if not self.message_handler.validate_email_address(recipient):
+                    continue
+                if recipient in self.excluded_emails:
+                    continue
+                if self.send_ledger and self.send_ledger.in_cooldown(
+                    recipient, config.RESEND_COOLDOWN_DAYS
+                ):
+                    continue
+                if not self.send_ledger:
+                    # Every occurrence is searched, as the sync driver does
+                    recipient_checks += 1
+                elif (
+                    recipient not in counted
+                    and self.send_ledger.known_count(recipient) is None
+                ):
+                    # The first search seeds the ledger; later checks read it
+                    counted.add(recipient)
+                    recipient_checks += 1
+                if f"{recipient}:{subject}" in processed:
+                    continue
+                processed.add(f"{recipient}:{subject}")
+                writes_per_domain[address_domain(recipient)] += 1
+                if config.FETCH_FORMAT == "full":
+                    attachment_downloads += attachments
+
+        writes = sum(writes_per_domain.values())
+        write_method = "drafts.create" if use_drafts else "messages.send"
+        if config.BATCH_WRITES and not config.DOMAIN_SCHEDULER:
+            write_method = batch_key(write_method)
+        stages = [
+            (f"discovery ({method})", method, calls)
+            for method, calls in sorted(discovery_calls.items())
+        ]
+        stages += [
+            ("fetch messages", "messages.get", len(message_ids)),
+            ("recipient checks", "messages.list", recipient_checks),
+            ("attachment downloads", "messages.attachments.get", attachment_downloads),
+            ("writes", write_method, writes),
+        ]
+        rows = []
+        for stage, method, calls in stages:
+            rows.append(
+                {
+                    "stage": stage,
+                    "method": method,
+                    "calls": calls,
+                    "units": calls * QUOTA_COSTS[base_method(method)],
+                    "seconds": calls * self.metrics.mean_latency(method),
+                    "measured": self.metrics.has_history(method),
+                }
+            )
+
+        units = sum(row["units"] for row in rows)
+        read_seconds = sum(row["seconds"] for row in rows[:-1])
+        write_seconds = self._write_seconds(writes_per_domain, rows[-1]["seconds"])
+        seconds = max(read_seconds + write_seconds, units / config.QUOTA_UNITS_PER_SECOND)
+
+        warnings = []
+        if writes > config.DAILY_SEND_LIMIT:
+            warnings.append(
+                f"{writes} writes exceed DAILY_SEND_LIMIT of {config.DAILY_SEND_LIMIT}"
+            )
+        if units > config.DAILY_QUOTA_UNITS:
+            warnings.append(
+                f"{units} quota units exceed DAILY_QUOTA_UNITS of {config.DAILY_QUOTA_UNITS}"
+            )
+        return {
+            "candidates": len(message_ids),
+            "job_messages": job_messages,
+            "stages": rows,
+            "units": units,
+            "seconds": seconds,
+            "warnings": warnings,
+        }
+
+    def _write_seconds(self, writes_per_domain, sequential_seconds):
+        """Wall time of the write stage including the configured send pacing"""
+        writes = sum(writes_per_domain.values())
+        if not writes:
+            return 0.0
+        if config.DOMAIN_SCHEDULER:
+            # Domains are written in parallel, each one spaced out by the minimum interval
+            busiest = max(writes_per_domain.values())
+            return max(
+                (busiest - 1) * config.DOMAIN_MIN_INTERVAL,
+                sequential_seconds / config.SEND_WORKERS,
+            )
+        if config.BATCH_WRITES:
+            batches = math.ceil(writes / config.BATCH_WRITE_SIZE)
+            return sequential_seconds + batches * config.SEND_DELAY
+        return sequential_seconds + writes * config.SEND_DELAY
+
+    def report(self, estimate):
+        self.logger.info("\n" + "=" * 50)
+        self.logger.info("RUN ESTIMATE")
+        self.logger.info("=" * 50)
+        self.logger.info(
+            f"Candidates: {estimate['candidates']} "
+            f"({estimate['job_messages']} look like job applications)"
+        )
+        for row in estimate["stages"]:
+            source = "measured" if row["measured"] else "default"
+            self.logger.info(
+                f"{row['stage']}: {row['calls']} x {row['method']} = {row['units']} units, "
+                f"~{row['seconds']:.0f}s ({source} latency)"
+            )
+        hours, remainder = divmod(int(estimate["seconds"]), 3600)
+        minutes, seconds = divmod(remainder, 60)
+        self.logger.info(f"Total quota units: {estimate['units']}")
+        self.logger.info(f"Projected wall time: {hours:02d}:{minutes:02d}:{seconds:02d}")
+        for warning in estimate["warnings"]:
+            self.logger.warning(f"⚠️  {warning}")
@@ -1,18 +1,27 @@
 import logging
 import os
+import time
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload
 
 import config
+from api_metrics import ApiMetrics, batch_key
+from quota_limiter import QUOTA_COSTS, QuotaLimiter
+from transport import ThreadLocalTransport
 
 
 class GmailService:
     def __init__(self):
         self.service = None
+        self.credentials = None
+        self.transport = None
+        self.quota_limiter = QuotaLimiter(config.QUOTA_UNITS_PER_SECOND)
+        self.metrics = ApiMetrics(config.METRICS_FILE)
         self.logger = logging.getLogger(__name__)
 
     def authenticate(self):
@@ -35,19 +44,41 @@ class GmailService:
                     config.CREDENTIALS_FILE, config.SCOPES
                 )
                 creds = flow.run_local_server(port=0)
-            with open(config.TOKEN_FILE, "w") as token:
-                token.write(creds.to_json())
+            self._save_token(creds)
+        self.credentials = creds
+        # Every request executes on the calling thread's own HTTP client
+        self.transport = ThreadLocalTransport(
+            creds,
+            refresh_margin_seconds=config.TOKEN_REFRESH_MARGIN_SECONDS,
+            timeout=config.HTTP_TIMEOUT,
+            on_refresh=self._save_token,
+        )
         self.service = build("gmail", "v1", credentials=creds)
         self.logger.info("Gmail service authenticated successfully")
         return self.service
 
+    def _save_token(self, creds):
+        with open(config.TOKEN_FILE, "w") as token:
+            token.write(creds.to_json())
+
+    def _execute(self, request, method):
+        """Execute a request on this thread's client, charging quota and recording latency"""
+        self.quota_limiter.acquire(QUOTA_COSTS[method])
+        start = time.monotonic()
+        try:
+            return request.execute(http=self.transport.http())
+        finally:
+            self.metrics.record(method, time.monotonic() - start)
+
     def search_messages(self, query, max_results=500):
         try:
-            response = (
-                self.service.users()
-                .messages()
-                .list(userId="me", q=query, maxResults=max_results)
-                .execute()
+            response = self._execute(
+                (
+                    self.service.users()
+                    .messages()
+                    .list(userId="me", q=query, maxResults=max_results)
+                ),
+                "messages.list",
             )
             messages = response.get("messages", [])
             self.logger.info(f"Found {len(messages)} messages matching query: {query}")
@@ -56,13 +87,77 @@ class GmailService:
             self.logger.error(f"An error occurred while searching: {error}")
             return []
 
-    def get_message(self, message_id):
+    def iter_messages(self, query, max_results=None, page_size=100):
+        """Yield message stubs page by page without materializing the full list"""
+        page_token = None
+        yielded = 0
+        while True:
+            if max_results is not None:
+                page_size = min(page_size, max_results - yielded)
+                if page_size <= 0:
+                    return
+            try:
+                response = self._execute(
+                    (
+                        self.service.users()
+                        .messages()
+                        .list(
+                            userId="me", q=query, maxResults=page_size, pageToken=page_token
+                        )
+                    ),
+                    "messages.list",
+                )
+            except HttpError as error:
+                self.logger.error(f"An error occurred while searching: {error}")
+                return
+            messages = response.get("messages", [])
+            self.logger.debug(f"Fetched page of {len(messages)} messages")
+            for message in messages:
+                yield message
+                yielded += 1
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                self.logger.info(f"Streamed {yielded} messages matching query: {query}")
+                return
+
+    def list_message_ids(self, query, max_results=500):
+        """List message IDs for a query; safe to call from worker threads"""
+        ids = []
+        page_token = None
         try:
-            message = (
-                self.service.users()
-                .messages()
-                .get(userId="me", id=message_id, format="full")
-                .execute()
+            while len(ids) < max_results:
+                response = self._execute(
+                    (
+                        self.service.users()
+                        .messages()
+                        .list(
+                            userId="me",
+                            q=query,
+                            maxResults=min(500, max_results - len(ids)),
+                            pageToken=page_token,
+                        )
+                    ),
+                    "messages.list",
+                )
+                ids.extend(message["id"] for message in response.get("messages", []))
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    break
+        except HttpError as error:
+            self.logger.error(f"An error occurred while searching: {error}")
+        self.logger.debug(f"Listed {len(ids)} messages for query: {query}")
+        return ids
+
+    def get_message(self, message_id, format="full"):
+        """Get a message; format="raw" returns the original RFC 822 bytes base64url-encoded"""
+        try:
+            message = self._execute(
+                (
+                    self.service.users()
+                    .messages()
+                    .get(userId="me", id=message_id, format=format)
+                ),
+                "messages.get",
             )
             return message
         except HttpError as error:
@@ -71,13 +166,63 @@ class GmailService:
             )
             return None
 
+    def get_messages_metadata(
+        self, message_ids, headers=("Subject",), batch_size=50, format="metadata", fields=None
+    ):
+        """Fetch headers, snippet and internalDate for many messages via batch requests.
+
+        fields selects a partial response, e.g. the part tree of a
+        format="full" message without any body data. Returns a dict of
+        message ID to message; messages that failed are left out.
+        """
+        options = {"format": format}
+        if format == "metadata":
+            options["metadataHeaders"] = list(headers)
+        if fields:
+            options["fields"] = fields
+        messages = {}
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                self.logger.error(
+                    f"An error occurred while getting metadata for {request_id}: {exception}"
+                )
+            else:
+                messages[request_id] = response
+
+        for start in range(0, len(message_ids), batch_size):
+            chunk = message_ids[start : start + batch_size]
+            self.quota_limiter.acquire(QUOTA_COSTS["messages.get"] * len(chunk))
+            started = time.monotonic()
+            batch = self.service.new_batch_http_request(callback=callback)
+            for message_id in chunk:
+                batch.add(
+                    self.service.users()
+                    .messages()
+                    .get(userId="me", id=message_id, **options),
+                    request_id=message_id,
+                )
+            try:
+                batch.execute(http=self.transport.http())
+            except HttpError as error:
+                self.logger.error(f"An error occurred while executing metadata batch: {error}")
+            self.metrics.record(
+                batch_key("messages.get"), time.monotonic() - started, calls=len(chunk)
+            )
+        self.logger.debug(f"Fetched metadata for {len(messages)}/{len(message_ids)} messages")
+        return messages
+
     def send_message(self, message_body):
+        if "spool_path" in message_body:
+            return self.upload_message(message_body["spool_path"])
         try:
-            message = (
-                self.service.users()
-                .messages()
-                .send(userId="me", body=message_body)
-                .execute()
+            message = self._execute(
+                (
+                    self.service.users()
+                    .messages()
+                    .send(userId="me", body=message_body)
+                ),
+                "messages.send",
             )
             self.logger.info(f"Message sent successfully. ID: {message['id']}")
             return message
@@ -112,11 +257,13 @@ class GmailService:
     def send_draft(self, draft_id):
         """Send an existing draft"""
         try:
-            message = (
-                self.service.users()
-                .drafts()
-                .send(userId="me", body={"id": draft_id})
-                .execute()
+            message = self._execute(
+                (
+                    self.service.users()
+                    .drafts()
+                    .send(userId="me", body={"id": draft_id})
+                ),
+                "drafts.send",
             )
             self.logger.info(f"Draft sent successfully. Message ID: {message['id']}")
             return message
@@ -128,12 +275,16 @@ class GmailService:
 
     def create_draft(self, message_body):
         """Create a draft message"""
+        if "spool_path" in message_body:
+            return self.upload_message(message_body["spool_path"], as_draft=True)
         try:
-            draft = (
-                self.service.users()
-                .drafts()
-                .create(userId="me", body={"message": message_body})
-                .execute()
+            draft = self._execute(
+                (
+                    self.service.users()
+                    .drafts()
+                    .create(userId="me", body={"message": message_body})
+                ),
+                "drafts.create",
             )
             self.logger.info(f"Draft created successfully. ID: {draft['id']}")
             return draft
@@ -141,15 +292,96 @@ class GmailService:
             self.logger.error(f"An error occurred while creating draft: {error}")
             return None
 
+    def create_drafts_batch(self, message_bodies):
+        """Create many drafts through batch HTTP requests.
+
+        Returns one result per message body, in input order, each a dict with
+        "success" and either "response" or "error".
+        """
+        return self._execute_write_batch(
+            message_bodies,
+            lambda body: self.service.users()
+            .drafts()
+            .create(userId="me", body={"message": body}),
+            self.create_draft,
+            "draft",
+            "drafts.create",
+        )
+
+    def send_messages_batch(self, message_bodies):
+        """Send many messages through batch HTTP requests.
+
+        Returns one result per message body, in input order, each a dict with
+        "success" and either "response" or "error".
+        """
+        return self._execute_write_batch(
+            message_bodies,
+            lambda body: self.service.users().messages().send(userId="me", body=body),
+            self.send_message,
+            "message",
+            "messages.send",
+        )
+
+    def _execute_write_batch(
+        self, message_bodies, build_request, write_one, kind, method
+    ):
+        results = [None] * len(message_bodies)
+
+        def callback(request_id, response, exception):
+            index = int(request_id)
+            if exception is not None:
+                self.logger.error(f"Batch {kind} {index} failed: {exception}")
+                results[index] = {"success": False, "error": str(exception)}
+            else:
+                results[index] = {"success": True, "response": response}
+
+        batched = []
+        for index, body in enumerate(message_bodies):
+            if "spool_path" in body:
+                # Large spooled messages need their own resumable upload
+                response = write_one(body)
+                results[index] = (
+                    {"success": True, "response": response}
+                    if response
+                    else {"success": False, "error": f"{kind} upload failed"}
+                )
+            else:
+                batched.append(index)
+
+        for start in range(0, len(batched), config.BATCH_WRITE_SIZE):
+            chunk = batched[start : start + config.BATCH_WRITE_SIZE]
+            # Each request inside a batch is charged separately
+            self.quota_limiter.acquire(QUOTA_COSTS[method] * len(chunk))
+            started = time.monotonic()
+            batch = self.service.new_batch_http_request(callback=callback)
+            for index in chunk:
+                batch.add(build_request(message_bodies[index]), request_id=str(index))
+            try:
+                batch.execute(http=self.transport.http())
+            except HttpError as error:
+                self.logger.error(f"An error occurred while executing {kind} batch: {error}")
+            self.metrics.record(
+                batch_key(method), time.monotonic() - started, calls=len(chunk)
+            )
+            for index in chunk:
+                if results[index] is None:
+                    results[index] = {"success": False, "error": "no response in batch"}
+
+        succeeded = sum(1 for result in results if result["success"])
+        self.logger.info(f"Batch {kind} write: {succeeded}/{len(results)} succeeded")
+        return results
+
     def get_attachment(self, message_id, attachment_id):
         """Get attachment data from a message"""
         try:
-            attachment = (
-                self.service.users()
-                .messages()
-                .attachments()
-                .get(userId="me", messageId=message_id, id=attachment_id)
-                .execute()
+            attachment = self._execute(
+                (
+                    self.service.users()
+                    .messages()
+                    .attachments()
+                    .get(userId="me", messageId=message_id, id=attachment_id)
+                ),
+                "messages.attachments.get",
             )
             self.logger.info(
                 f"Retrieved attachment {attachment_id} from message {message_id}"
@@ -160,3 +392,69 @@ class GmailService:
                 f"An error occurred while getting attachment {attachment_id}: {error}"
             )
             return None
+
+    def upload_message(self, spool_path, as_draft=False):
+        """Send or draft a spooled RFC 822 message with a resumable media upload.
+
+        After a network failure the upload resumes from the last chunk the
+        server acknowledged instead of starting over. The whole upload is
+        recorded in the metrics as one call of the write method.
+        """
+        method = "drafts.create" if as_draft else "messages.send"
+        media = MediaFileUpload(
+            spool_path,
+            mimetype="message/rfc822",
+            chunksize=config.UPLOAD_CHUNK_SIZE_MB * 1024 * 1024,
+            resumable=True,
+        )
+        self.quota_limiter.acquire(QUOTA_COSTS[method])
+        if as_draft:
+            request = (
+                self.service.users()
+                .drafts()
+                .create(userId="me", body={}, media_body=media)
+            )
+        else:
+            request = (
+                self.service.users()
+                .messages()
+                .send(userId="me", body={}, media_body=media)
+            )
+
+        started = time.monotonic()
+        response = None
+        retries = 0
+        while response is None:
+            try:
+                status, response = request.next_chunk(http=self.transport.http())
+                retries = 0
+                if status:
+                    self.logger.info(f"Uploaded {int(status.progress() * 100)}%")
+            except (HttpError, OSError) as error:
+                if isinstance(error, HttpError) and error.resp.status not in (
+                    429,
+                    500,
+                    502,
+                    503,
+                    504,
+                ):
+                    self.logger.error(f"An error occurred while uploading message: {error}")
+                    return None
+                retries += 1
+                if retries > config.UPLOAD_MAX_RETRIES:
+                    self.logger.error(
+                        f"Giving up on upload after {config.UPLOAD_MAX_RETRIES} retries: {error}"
+                    )
+                    return None
+                delay = 2**retries
+                self.logger.warning(
+                    f"Upload interrupted ({error}), resuming in {delay} seconds..."
+                )
+                time.sleep(delay)
+        self.metrics.record(method, time.monotonic() - started)
+
+        if as_draft:
+            self.logger.info(f"Draft created successfully. ID: {response['id']}")
+        else:
+            self.logger.info(f"Message sent successfully. ID: {response['id']}")
+        return response
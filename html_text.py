@@ -0,0 +1,118 @@
+import base64
+import codecs
+from html.parser import HTMLParser
+
+# Elements whose content is never shown as text
+SKIPPED_TAGS = {"head", "script", "style", "title", "noscript", "template", "svg"}
+# Elements that separate words when rendered
+BREAK_TAGS = {
+    "br",
+    "p",
+    "div",
+    "li",
+    "tr",
+    "td",
+    "th",
+    "table",
+    "section",
+    "article",
+    "blockquote",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "hr",
+    "ul",
+    "ol",
+}
+
+
+class _BudgetReached(Exception):
+    pass
+
+
+class _TextExtractor(HTMLParser):
+    """Collect visible text with whitespace collapsed, up to max_chars"""
+
+    def __init__(self, max_chars=None):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.pieces = []
+        self.length = 0
+        self.skip_depth = 0
+        self.pending_space = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            # An unclosed <head> must not hide the whole document
+            self.skip_depth = 0
+        elif tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in BREAK_TAGS:
+            self.pending_space = True
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(self.skip_depth - 1, 0)
+        elif tag in BREAK_TAGS:
+            self.pending_space = True
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        words = data.split()
+        if not words:
+            self.pending_space = self.pending_space or bool(data)
+            return
+        text = " ".join(words)
+        if self.pieces and (self.pending_space or data[0].isspace()):
+            text = " " + text
+        self.pending_space = data[-1].isspace()
+        if self.max_chars is not None and self.length + len(text) >= self.max_chars:
+            text = text[: self.max_chars - self.length]
+            self.pieces.append(text)
+            self.length += len(text)
+            raise _BudgetReached
+        self.pieces.append(text)
+        self.length += len(text)
+
+    def text(self):
+        return "".join(self.pieces).strip()
+
+
+def html_to_text(chunks, max_chars=None):
+    """Convert HTML to whitespace-collapsed text, stopping after max_chars.
+
+    chunks is a string or an iterable of strings; later chunks are not read
+    once the budget is reached. Text inside head, script, style and similar
+    elements is dropped and character references are decoded.
+    """
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+    extractor = _TextExtractor(max_chars)
+    try:
+        for chunk in chunks:
+            extractor.feed(chunk)
+        extractor.close()
+    except _BudgetReached:
+        pass
+    return extractor.text()
+
+
+def iter_base64_text(data, charset="utf-8", chunk_size=64 * 1024):
+    """Decode base64url text data piece by piece instead of all at once"""
+    decoder = codecs.getincrementaldecoder(charset)(errors="ignore")
+    # Chunk boundaries must fall on whole 4-character base64 groups
+    chunk_size -= chunk_size % 4
+    for start in range(0, len(data), chunk_size):
+        piece = data[start : start + chunk_size]
+        piece += "=" * (-len(piece) % 4)
+        yield decoder.decode(base64.urlsafe_b64decode(piece))
+    yield decoder.decode(b"", final=True)
+
+
+def iter_text_chunks(text, chunk_size=64 * 1024):
+    for start in range(0, len(text), chunk_size):
+        yield text[start : start + chunk_size]
@@ -5,16 +5,31 @@ Automatically resends job application emails from your sent folder with scheduli
 """
 
 import argparse
+import asyncio
+import base64
 import logging
 import os
 import subprocess
+import sqlite3
 import sys
+import threading
 import time
+from collections import deque
 from datetime import datetime, timedelta
 
 import config
+from address_utils import address_domain
+from async_gmail_service import AsyncGmailService
+from cost_estimator import CostEstimator
 from gmail_service import GmailService
+from memory_monitor import MemoryMonitor
 from message_handler import MessageHandler
+from offline_source import open_offline_source
+from scoring import CandidateScorer, top_k
+from search_planner import SearchPlanner
+from send_ledger import SendLedger
+from send_scheduler import DomainSendScheduler
+from work_queue import WorkQueue
 
 
 def setup_logging():
@@ -99,6 +114,224 @@ def count_emails_to_recipient(gmail_service, recipient_email, logger):
         return 0
 
 
+class CountingIterator:
+    """Wrap an iterator and count the items it has produced"""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._iterator)
+        self.count += 1
+        return item
+
+
+class InFlightRecipients:
+    """Recipients with a resend queued in this run but not yet written
+
+    Queued sends count toward MAX_EMAILS_PER_RECIPIENT, and with
+    AUTO_EXCLUDE_AFTER_SEND a recipient is excluded as soon as its resend is
+    queued, so a later message cannot queue a second one before the first is
+    written. A failed write lifts the exclusion again.
+
+    Args:
+        excluded_emails: The run's set of excluded addresses
+        counted: Whether queued writes count as sends; drafts do not
+    """
+
+    def __init__(self, excluded_emails, counted=True):
+        self.excluded_emails = excluded_emails
+        self.counted = counted
+        self._counts = {}
+        self._excluded = set()
+        self._lock = threading.Lock()
+
+    def count(self, recipient):
+        with self._lock:
+            return self._counts.get(recipient, 0) if self.counted else 0
+
+    def reserve(self, recipient):
+        with self._lock:
+            self._counts[recipient] = self._counts.get(recipient, 0) + 1
+            if config.AUTO_EXCLUDE_AFTER_SEND and recipient not in self.excluded_emails:
+                self.excluded_emails.add(recipient)
+                self._excluded.add(recipient)
+
+    def release(self, recipient, sent):
+        with self._lock:
+            remaining = self._counts.get(recipient, 0) - 1
+            if remaining > 0:
+                self._counts[recipient] = remaining
+            else:
+                self._counts.pop(recipient, None)
+            if sent:
+                # record_successful_send has made the exclusion permanent
+                self._excluded.discard(recipient)
+            elif remaining <= 0 and recipient in self._excluded:
+                self._excluded.discard(recipient)
+                self.excluded_emails.discard(recipient)
+
+
+class MessageTracker:
+    """Finish messages only once every write queued for them has completed
+
+    With batched or scheduled writes a message's resends may still be pending
+    when the driver moves on. A message is finished when the driver is done
+    with it and its last write has reported back: it is then marked complete
+    in the work queue, failed if any step failed, and its record is released.
+    """
+
+    def __init__(self, work_queue=None):
+        self.work_queue = work_queue
+        self._messages = {}
+        self._lock = threading.Lock()
+
+    def add_write(self, message_id):
+        with self._lock:
+            entry = self._messages.setdefault(
+                message_id, {"writes": 0, "failed": False, "done": False, "record": None}
+            )
+            entry["writes"] += 1
+
+    def write_done(self, message_id, failed):
+        with self._lock:
+            entry = self._messages[message_id]
+            entry["writes"] -= 1
+            entry["failed"] = entry["failed"] or failed
+            if entry["writes"] or not entry["done"]:
+                return
+            del self._messages[message_id]
+        self._complete(message_id, entry["record"], entry["failed"])
+
+    def finish(self, message_id, record, failed):
+        """The driver is done with a message; complete it unless writes are pending"""
+        with self._lock:
+            entry = self._messages.get(message_id)
+            if entry and entry["writes"]:
+                entry.update(done=True, record=record, failed=entry["failed"] or failed)
+                return
+            self._messages.pop(message_id, None)
+            failed = failed or bool(entry and entry["failed"])
+        self._complete(message_id, record, failed)
+
+    def _complete(self, message_id, record, failed):
+        if record is not None:
+            record.release()
+        if self.work_queue:
+            self.work_queue.complete(message_id, failed=failed)
+
+
+def rank_candidates(gmail_service, messages, limit, logger):
+    """Score candidate messages from their metadata and keep the best `limit`
+
+    Only subject, snippet and sent time are fetched, so a large pool can be
+    ranked before any full message is downloaded.
+    """
+    message_ids = [message["id"] for message in messages]
+    metadata = gmail_service.get_messages_metadata(message_ids)
+    ids = [message_id for message_id in message_ids if message_id in metadata]
+    subjects = []
+    for message_id in ids:
+        headers = metadata[message_id].get("payload", {}).get("headers", [])
+        subjects.append(
+            next(
+                (h["value"] for h in headers if h["name"].lower() == "subject"), ""
+            )
+        )
+    snippets = [metadata[message_id].get("snippet", "") for message_id in ids]
+    sent_timestamps = [
+        int(metadata[message_id].get("internalDate", 0)) / 1000 for message_id in ids
+    ]
+
+    scorer = CandidateScorer(
+        config.JOB_KEYWORDS,
+        config.JOB_PATTERNS,
+        {
+            "subject_keywords": config.SCORE_SUBJECT_WEIGHT,
+            "body_keywords": config.SCORE_BODY_WEIGHT,
+            "body_patterns": config.SCORE_PATTERN_WEIGHT,
+            "age": config.SCORE_AGE_WEIGHT,
+        },
+        age_peak_days=config.SCORE_AGE_PEAK_DAYS,
+        age_half_life_days=config.SCORE_AGE_HALF_LIFE_DAYS,
+    )
+    scores = scorer.score(subjects, snippets, sent_timestamps)
+    best = top_k(scores, limit)
+    logger.info(
+        f"Ranked {len(ids)} candidates, keeping the top {len(best)}"
+        + (f" (scores {scores[best[0]]:.2f} to {scores[best[-1]]:.2f})" if best else "")
+    )
+    return [{"id": ids[index]} for index in best]
+
+
+def screen_recipients(
+    count_recipient,
+    message_handler,
+    message_data,
+    excluded_emails,
+    processed_recipients,
+    logger,
+    send_ledger=None,
+    in_flight=None,
+):
+    """Apply validation, exclusion and per-recipient limits to each recipient
+
+    count_recipient returns how many emails have already gone to an address;
+    resends queued in InFlightRecipients are added to it. With a SendLedger,
+    recipients contacted within RESEND_COOLDOWN_DAYS are rejected as well.
+    Returns the recipients still eligible for a resend and how many were rejected.
+    """
+    eligible = []
+    rejected_count = 0
+    for recipient in message_data["recipients"]:
+        if not message_handler.validate_email_address(recipient):
+            logger.warning(f"Invalid recipient email address: {recipient}")
+            rejected_count += 1
+            continue
+
+        # Check if email is in exclusion list
+        if recipient in excluded_emails:
+            logger.info(f"Email excluded from resending: {recipient}")
+            rejected_count += 1
+            continue
+
+        if send_ledger and send_ledger.in_cooldown(
+            recipient, config.RESEND_COOLDOWN_DAYS
+        ):
+            logger.info(
+                f"Contacted {recipient} within the last {config.RESEND_COOLDOWN_DAYS} days, skipping"
+            )
+            rejected_count += 1
+            continue
+
+        # Check if we've already sent too many emails to this recipient
+        email_count = count_recipient(recipient)
+        if in_flight:
+            email_count += in_flight.count(recipient)
+        if email_count >= config.MAX_EMAILS_PER_RECIPIENT:
+            logger.info(
+                f"Already sent {email_count} emails to {recipient} (limit: {config.MAX_EMAILS_PER_RECIPIENT}), skipping"
+            )
+            rejected_count += 1
+            continue
+
+        recipient_key = f"{recipient}:{message_data['subject']}"
+        if recipient_key in processed_recipients:
+            logger.info(
+                f"Already processed this recipient/subject combination: {recipient}"
+            )
+            rejected_count += 1
+            continue
+
+        processed_recipients.add(recipient_key)
+        eligible.append(recipient)
+    return eligible, rejected_count
+
+
 def create_scheduled_task(scheduled_time):
     """Create a Windows Task Scheduler task to run the script at the specified time"""
     try:
@@ -311,6 +544,199 @@ def wait_until_scheduled_time(scheduled_time):
     return True
 
 
+def record_successful_send(
+    recipient,
+    excluded_emails,
+    logger,
+    work_queue=None,
+    subject=None,
+    send_ledger=None,
+    response=None,
+    is_draft=False,
+):
+    """Bookkeeping after a resend to one recipient has succeeded
+
+    response is the Gmail API result, whose message or draft ID is logged in
+    the send ledger.
+    """
+    if send_ledger:
+        try:
+            send_ledger.record(recipient, subject or "", response, is_draft)
+        except sqlite3.Error as e:
+            logger.error(f"Could not record send to {recipient} in the ledger: {e}")
+    if work_queue:
+        # Count, resent subject and exclusion are shared with the other workers
+        work_queue.finish_recipient(
+            recipient, subject, sent=True, exclude=config.AUTO_EXCLUDE_AFTER_SEND
+        )
+    # Add recipient to exclusion list after successful send (if enabled)
+    if config.AUTO_EXCLUDE_AFTER_SEND:
+        add_to_exclusion_list(recipient)
+        excluded_emails.add(recipient)
+        if config.INTERACTIVE_MODE:
+            print(f"✓ Email sent successfully to {recipient}")
+            print(f"✓ Added {recipient} to exclusion list")
+        else:
+            logger.info(f"Added {recipient} to exclusion list after sending")
+    else:
+        if config.INTERACTIVE_MODE:
+            print(f"✓ Email sent successfully to {recipient}")
+
+
+def finish_write(
+    recipient,
+    subject,
+    response,
+    is_draft,
+    excluded_emails,
+    logger,
+    work_queue=None,
+    send_ledger=None,
+    in_flight=None,
+    message_tracker=None,
+    message_id=None,
+):
+    """Bookkeeping after a resend write to one recipient; response is None on failure
+
+    Every driver finishes each write here, whatever its outcome: a success is
+    recorded through record_successful_send, a failure releases the work queue
+    claim, and either way the in-flight reservation is lifted and the message
+    tracker told. Returns whether the write succeeded.
+    """
+    if response:
+        record_successful_send(
+            recipient,
+            excluded_emails,
+            logger,
+            work_queue,
+            subject,
+            send_ledger,
+            response,
+            is_draft,
+        )
+    elif work_queue:
+        work_queue.finish_recipient(recipient, subject, sent=False)
+    if in_flight:
+        in_flight.release(recipient, sent=bool(response))
+    if message_tracker:
+        message_tracker.write_done(message_id, failed=not response)
+    return bool(response)
+
+
+def flush_pending_writes(
+    gmail_service,
+    message_handler,
+    pending_writes,
+    logger,
+    finish,
+    use_drafts=False,
+):
+    """Write queued resends in batch requests and finish each one individually
+
+    Args:
+        pending_writes: List of (recipient, subject, resend_message, message_id)
+            tuples; emptied on return
+        finish: Called as finish(recipient, subject, response, message_id) for
+            every write, with response None on failure; see finish_write
+        use_drafts: If True, create drafts instead of sending
+
+    Returns (succeeded, failed) counts.
+    """
+    if not pending_writes:
+        return 0, 0
+    bodies = [resend_message for _, _, resend_message, _ in pending_writes]
+    try:
+        if use_drafts:
+            results = gmail_service.create_drafts_batch(bodies)
+        else:
+            results = gmail_service.send_messages_batch(bodies)
+    except Exception as e:
+        # No per-item outcome is known, so the whole batch counts as failed
+        logger.error(f"Batch write of {len(bodies)} resends failed: {e}")
+        results = [{"success": False, "error": str(e)} for _ in bodies]
+    finally:
+        for resend_message in bodies:
+            message_handler.release_resend_message(resend_message)
+
+    succeeded = 0
+    failed = 0
+    for (recipient, subject, _, message_id), result in zip(pending_writes, results):
+        if result["success"]:
+            succeeded += 1
+            action = "Created draft" if use_drafts else "Sent resend"
+            logger.info(f"{action} for {recipient}")
+            finish(recipient, subject, result["response"], message_id)
+        else:
+            failed += 1
+            logger.error(f"Failed to write resend for {recipient}: {result['error']}")
+            finish(recipient, subject, None, message_id)
+    pending_writes.clear()
+
+    if config.SEND_DELAY > 0:
+        logger.info(f"Waiting {config.SEND_DELAY} seconds...")
+        time.sleep(config.SEND_DELAY)
+    return succeeded, failed
+
+
+def start_domain_scheduler(
+    gmail_service,
+    message_handler,
+    logger,
+    finish,
+    scheduled_time=None,
+    create_drafts_only=False,
+):
+    """Start a DomainSendScheduler that builds and writes resends on worker threads
+
+    Jobs are (recipient, message_data, message_id) tuples, and each one is
+    finished with finish(recipient, subject, response, message_id) as it
+    completes. Returns the scheduler and a dict of succeeded/failed counts that
+    is filled in as jobs complete.
+    """
+    counts = {"succeeded": 0, "failed": 0}
+    counts_lock = threading.Lock()
+
+    def run_job(job):
+        recipient, message_data, _ = job
+        resend_message = message_handler.create_resend_message(message_data, recipient)
+        if not resend_message:
+            logger.error(f"Could not create resend message for {recipient}")
+            return None
+        try:
+            if create_drafts_only:
+                return gmail_service.create_draft(resend_message)
+            if scheduled_time:
+                return gmail_service.send_scheduled_message(
+                    resend_message, scheduled_time
+                )
+            return gmail_service.send_message(resend_message)
+        finally:
+            message_handler.release_resend_message(resend_message)
+
+    def on_complete(job, result, error):
+        recipient, message_data, message_id = job
+        with counts_lock:
+            if result and not error:
+                counts["succeeded"] += 1
+                action = "Created draft" if create_drafts_only or scheduled_time else "Sent resend"
+                logger.info(f"{action} for {recipient}")
+                finish(recipient, message_data["subject"], result, message_id)
+            else:
+                counts["failed"] += 1
+                logger.error(f"Failed to write resend for {recipient}")
+                finish(recipient, message_data["subject"], None, message_id)
+
+    scheduler = DomainSendScheduler(
+        run_job,
+        on_complete,
+        min_interval=config.DOMAIN_MIN_INTERVAL,
+        per_domain_concurrency=config.DOMAIN_CONCURRENCY,
+        max_workers=config.SEND_WORKERS,
+        max_pending=config.DOMAIN_MAX_PENDING,
+    )
+    return scheduler, counts
+
+
 def process_emails_batch(
     gmail_service,
     message_handler,
@@ -319,27 +745,105 @@ def process_emails_batch(
     logger,
     scheduled_time=None,
     create_drafts_only=False,
+    memory_monitor=None,
+    work_queue=None,
+    send_ledger=None,
 ):
     """Process emails in batch with optional scheduling
 
     Args:
         gmail_service: GmailService instance
         message_handler: MessageHandler instance
-        messages: List of message IDs to process
+        messages: List or iterator of message IDs to process
         excluded_emails: Set of emails to exclude
         logger: Logger instance
         scheduled_time: Optional datetime for draft delivery scheduling
         create_drafts_only: If True, only create drafts without scheduling
+        memory_monitor: Optional MemoryMonitor checked before each message; over
+            budget the part cache is dropped and queued writes flushed, and the
+            run stops if that is not enough
+        work_queue: Optional WorkQueue shared with other workers; recipients are
+            claimed through it and messages marked complete once all their
+            writes have finished
+        send_ledger: Optional SendLedger used for recipient counts and
+            cooldowns and updated after every write
+
+    With DOMAIN_SCHEDULER enabled, resends are handed to a DomainSendScheduler
+    and written in the background; the counts include them once it has drained.
     """
     resent_count = 0
     skipped_count = 0
     error_count = 0
     processed_recipients = set()
+    pending_writes = []
+    use_drafts = create_drafts_only or bool(scheduled_time)
+    in_flight = InFlightRecipients(excluded_emails, counted=not use_drafts)
+    message_tracker = MessageTracker(work_queue)
+
+    def _finish_write(recipient, subject, response, message_id):
+        if not response:
+            # Let a work queue retry of the message write to this recipient again
+            processed_recipients.discard(f"{recipient}:{subject}")
+        return finish_write(
+            recipient,
+            subject,
+            response,
+            use_drafts,
+            excluded_emails,
+            logger,
+            work_queue,
+            send_ledger,
+            in_flight,
+            message_tracker,
+            message_id,
+        )
+
+    def flush():
+        """Write out queued batch writes; returns how many failed"""
+        nonlocal resent_count, error_count
+        succeeded, failed = flush_pending_writes(
+            gmail_service,
+            message_handler,
+            pending_writes,
+            logger,
+            _finish_write,
+            use_drafts,
+        )
+        resent_count += succeeded
+        error_count += failed
+        return failed
+
+    scheduler = None
+    if config.DOMAIN_SCHEDULER and not config.DRY_RUN:
+        scheduler, scheduled_counts = start_domain_scheduler(
+            gmail_service,
+            message_handler,
+            logger,
+            _finish_write,
+            scheduled_time,
+            create_drafts_only,
+        )
+    # Streaming runs pass a generator, so the total is not known up front
+    total = f"/{len(messages)}" if hasattr(messages, "__len__") else ""
 
     for i, message_meta in enumerate(messages, 1):
+        if memory_monitor and not memory_monitor.check():
+            # Drop cached parts and write out queued resends, then re-measure
+            message_handler.part_cache.clear()
+            flush()
+            if not memory_monitor.check():
+                logger.error(
+                    f"Memory usage stays over budget, stopping after {i-1} messages; "
+                    f"the rest are left for the next run"
+                )
+                break
+        errors_before = error_count
+        message_data = None
         try:
-            logger.info(f"Processing message {i}/{len(messages)}")
-            full_message = gmail_service.get_message(message_meta["id"])
+            logger.info(f"Processing message {i}{total}")
+            full_message = gmail_service.get_message(
+                message_meta["id"], format=config.FETCH_FORMAT
+            )
             if not full_message:
                 logger.warning(f"Could not retrieve message {message_meta['id']}")
                 error_count += 1
@@ -360,163 +864,223 @@ def process_emails_batch(
                 skipped_count += 1
                 continue
 
-            if not message_handler.validate_email_address(message_data["to"]):
-                logger.warning(f"Invalid recipient email address: {message_data['to']}")
-                skipped_count += 1
-                continue
-
-            # Check if email is in exclusion list
-            if message_data["to"].lower() in excluded_emails:
-                logger.info(f"Email excluded from resending: {message_data['to']}")
-                skipped_count += 1
-                continue
-
-            # Check if we've already sent too many emails to this recipient
-            email_count = count_emails_to_recipient(
-                gmail_service, message_data["to"], logger
-            )
-            if email_count >= config.MAX_EMAILS_PER_RECIPIENT:
-                logger.info(
-                    f"Already sent {email_count} emails to {message_data['to']} (limit: {config.MAX_EMAILS_PER_RECIPIENT}), skipping"
+            if send_ledger:
+                # Gmail is only searched for addresses the ledger has not seen yet
+                search_count = lambda recipient: send_ledger.recipient_count(
+                    recipient,
+                    lambda: count_emails_to_recipient(gmail_service, recipient, logger),
                 )
-                skipped_count += 1
-                continue
-
-            recipient_key = f"{message_data['to']}:{message_data['subject']}"
-            if recipient_key in processed_recipients:
-                logger.info(
-                    f"Already processed this recipient/subject combination: {message_data['to']}"
+            else:
+                search_count = lambda recipient: count_emails_to_recipient(
+                    gmail_service, recipient, logger
                 )
-                skipped_count += 1
+            if work_queue:
+                count_recipient = lambda recipient: work_queue.recipient_count(
+                    recipient, lambda: search_count(recipient)
+                )
+            else:
+                count_recipient = search_count
+            recipients, rejected_count = screen_recipients(
+                count_recipient,
+                message_handler,
+                message_data,
+                excluded_emails,
+                processed_recipients,
+                logger,
+                send_ledger,
+                in_flight,
+            )
+            skipped_count += rejected_count
+            if not recipients:
+                if not message_data["recipients"]:
+                    logger.warning(f"No recipient addresses in message {message_data['id']}")
+                    skipped_count += 1
                 continue
 
-            processed_recipients.add(recipient_key)
-
-            # Interactive mode: Ask user whether to resend this email
-            if config.INTERACTIVE_MODE:
-                print(f"\n{'='*60}")
-                print(f"Email {i}/{len(messages)}")
-                print(f"To: {message_data['to']}")
-                print(f"Subject: {message_data['subject']}")
-                print(f"Date: {message_data['date']}")
-                print(f"{'='*60}")
-
-                # Show a preview of the email body (first 200 characters)
-                body_preview = (
-                    message_data["body"][:200] + "..."
-                    if len(message_data["body"]) > 200
-                    else message_data["body"]
-                )
-                print(f"Body preview:\n{body_preview}\n")
+            for recipient in recipients:
+                # Interactive mode: Ask user whether to resend this email
+                if config.INTERACTIVE_MODE:
+                    print(f"\n{'='*60}")
+                    print(f"Email {i}{total}")
+                    print(f"To: {recipient}")
+                    print(f"Subject: {message_data['subject']}")
+                    print(f"Date: {message_data['date']}")
+                    print(f"{'='*60}")
+
+                    # Show a preview of the email body (first 200 characters)
+                    body_preview = (
+                        message_data["body"][:200] + "..."
+                        if len(message_data["body"]) > 200
+                        else message_data["body"]
+                    )
+                    print(f"Body preview:\n{body_preview}\n")
 
-                while True:
-                    user_choice = (
-                        input(
-                            "Do you want to resend this email? (y/n/e to exclude permanently/q to quit): "
+                    while True:
+                        user_choice = (
+                            input(
+                                "Do you want to resend this email? (y/n/e to exclude permanently/q to quit): "
+                            )
+                            .lower()
+                            .strip()
                         )
-                        .lower()
-                        .strip()
-                    )
-                    if user_choice in ["y", "yes"]:
-                        break
-                    elif user_choice in ["n", "no"]:
-                        logger.info(
-                            f"User chose to skip email to: {message_data['to']}"
+                        if user_choice in ["y", "yes"]:
+                            break
+                        elif user_choice in ["n", "no"]:
+                            logger.info(f"User chose to skip email to: {recipient}")
+                            skipped_count += 1
+                            break
+                        elif user_choice in ["e", "exclude"]:
+                            # Add email to exclusion list and also to current set
+                            add_to_exclusion_list(recipient)
+                            excluded_emails.add(recipient)
+                            if work_queue:
+                                work_queue.add_exclusion(recipient)
+                            logger.info(
+                                f"User chose to permanently exclude email: {recipient}"
+                            )
+                            skipped_count += 1
+                            break
+                        elif user_choice in ["q", "quit"]:
+                            logger.info("User chose to quit the application")
+                            print(f"\nExiting... Processed {i-1} emails so far.")
+                            flush()
+                            if scheduler:
+                                scheduler.close()
+                                resent_count += scheduled_counts["succeeded"]
+                                error_count += scheduled_counts["failed"]
+                            return (
+                                resent_count,
+                                skipped_count,
+                                error_count,
+                                True,
+                            )  # True indicates quit
+                        else:
+                            print(
+                                "Please enter 'y' for yes, 'n' for no, 'e' to exclude permanently, or 'q' to quit."
+                            )
+
+                    # If user chose 'n' or 'e', skip to next recipient
+                    if user_choice in ["n", "no", "e", "exclude"]:
+                        continue
+
+                logger.info(f"Resending application to: {recipient}")
+                logger.info(f"Subject: {message_data['subject']}")
+
+                if not config.DRY_RUN:
+                    if work_queue:
+                        # Atomic across workers: exclusions, limits and in-flight sends
+                        refusal = work_queue.claim_recipient(
+                            recipient,
+                            message_data["subject"],
+                            message_data["id"],
+                            config.MAX_EMAILS_PER_RECIPIENT,
                         )
-                        skipped_count += 1
-                        break
-                    elif user_choice in ["e", "exclude"]:
-                        # Add email to exclusion list and also to current set
-                        add_to_exclusion_list(message_data["to"])
-                        excluded_emails.add(message_data["to"].lower())
-                        logger.info(
-                            f"User chose to permanently exclude email: {message_data['to']}"
+                        if refusal:
+                            logger.info(f"Skipping {recipient}: {refusal}")
+                            skipped_count += 1
+                            continue
+                    # Every outcome from here on is finished through _finish_write
+                    in_flight.reserve(recipient)
+                    message_tracker.add_write(message_meta["id"])
+                    if scheduler:
+                        # Built and written on a worker thread once the domain's turn comes
+                        scheduler.submit(
+                            address_domain(recipient),
+                            (recipient, message_data, message_meta["id"]),
                         )
-                        skipped_count += 1
-                        break
-                    elif user_choice in ["q", "quit"]:
-                        logger.info("User chose to quit the application")
-                        print(f"\nExiting... Processed {i-1} emails so far.")
-                        return (
-                            resent_count,
-                            skipped_count,
-                            error_count,
-                            True,
-                        )  # True indicates quit
-                    else:
-                        print(
-                            "Please enter 'y' for yes, 'n' for no, 'e' to exclude permanently, or 'q' to quit."
+                        continue
+                    resend_message = None
+                    try:
+                        resend_message = message_handler.create_resend_message(
+                            message_data, recipient
                         )
-
-                # If user chose 'n' or 'e', skip to next email
-                if user_choice in ["n", "no", "e", "exclude"]:
-                    continue
-
-            logger.info(f"Resending application to: {message_data['to']}")
-            logger.info(f"Subject: {message_data['subject']}")
-
-            if not config.DRY_RUN:
-                resend_message = message_handler.create_resend_message(message_data)
-                if not resend_message:
-                    logger.error(
-                        f"Could not create resend message for {message_data['to']}"
-                    )
-                    error_count += 1
-                    continue
-                if create_drafts_only:
-                    # Create draft only - user will schedule themselves
-                    draft = gmail_service.create_draft(resend_message)
-                    if draft:
-                        logger.info(
-                            f"Created draft for {message_data['to']} - you can schedule it in Gmail"
+                    finally:
+                        if not resend_message:
+                            _finish_write(
+                                recipient, message_data["subject"], None, message_meta["id"]
+                            )
+                    if not resend_message:
+                        logger.error(f"Could not create resend message for {recipient}")
+                        error_count += 1
+                        continue
+                    if config.BATCH_WRITES:
+                        # Queue the write; each item is recorded once its own request succeeds
+                        pending_writes.append(
+                            (
+                                recipient,
+                                message_data["subject"],
+                                resend_message,
+                                message_meta["id"],
+                            )
                         )
-                    else:
-                        logger.error(f"Failed to create draft for {message_data['to']}")
+                        if len(pending_writes) >= config.BATCH_WRITE_SIZE:
+                            # Write failures reach their own messages via the tracker
+                            errors_before += flush()
+                        continue
+                    response = None
+                    try:
+                        if create_drafts_only:
+                            # Create draft only - user will schedule themselves
+                            response = gmail_service.create_draft(resend_message)
+                            if response:
+                                logger.info(
+                                    f"Created draft for {recipient} - you can schedule it in Gmail"
+                                )
+                        elif scheduled_time:
+                            # Create draft for scheduled delivery
+                            response = gmail_service.send_scheduled_message(
+                                resend_message, scheduled_time
+                            )
+                            if response:
+                                logger.info(
+                                    f"Created draft for scheduled delivery at {scheduled_time.strftime('%Y-%m-%d %H:%M:%S')}"
+                                )
+                        else:
+                            # Send immediately
+                            response = gmail_service.send_message(resend_message)
+                    finally:
+                        # Remove any spool file written for a large message
+                        message_handler.release_resend_message(resend_message)
+                        sent = _finish_write(
+                            recipient,
+                            message_data["subject"],
+                            response,
+                            message_meta["id"],
+                        )
+                    if not sent:
+                        logger.error(f"Failed to write resend for {recipient}")
                         error_count += 1
                         continue
-                elif scheduled_time:
-                    # Create draft for scheduled delivery
-                    gmail_service.send_scheduled_message(resend_message, scheduled_time)
-                    logger.info(
-                        f"Created draft for scheduled delivery at {scheduled_time.strftime('%Y-%m-%d %H:%M:%S')}"
-                    )
-                else:
-                    # Send immediately
-                    gmail_service.send_message(resend_message)
-                resent_count += 1
+                    resent_count += 1
 
-                # Add recipient to exclusion list after successful send (if enabled)
-                if config.AUTO_EXCLUDE_AFTER_SEND:
-                    add_to_exclusion_list(message_data["to"])
-                    excluded_emails.add(message_data["to"].lower())
-                    if config.INTERACTIVE_MODE:
-                        print(f"✓ Email sent successfully to {message_data['to']}")
-                        print(f"✓ Added {message_data['to']} to exclusion list")
-                    else:
-                        logger.info(
-                            f"Added {message_data['to']} to exclusion list after sending"
-                        )
+                    if config.SEND_DELAY > 0:
+                        logger.info(f"Waiting {config.SEND_DELAY} seconds...")
+                        time.sleep(config.SEND_DELAY)
                 else:
+                    logger.info("DRY RUN: Would resend message here")
+                    resent_count += 1
                     if config.INTERACTIVE_MODE:
-                        print(f"✓ Email sent successfully to {message_data['to']}")
-
-                if config.SEND_DELAY > 0:
-                    logger.info(f"Waiting {config.SEND_DELAY} seconds...")
-                    time.sleep(config.SEND_DELAY)
-            else:
-                logger.info("DRY RUN: Would resend message here")
-                resent_count += 1
-                if config.INTERACTIVE_MODE:
-                    print(f"✓ DRY RUN: Would send email to {message_data['to']}")
-                    if config.AUTO_EXCLUDE_AFTER_SEND:
-                        print(
-                            f"✓ DRY RUN: Would add {message_data['to']} to exclusion list"
-                        )
+                        print(f"✓ DRY RUN: Would send email to {recipient}")
+                        if config.AUTO_EXCLUDE_AFTER_SEND:
+                            print(f"✓ DRY RUN: Would add {recipient} to exclusion list")
 
         except Exception as e:
             logger.error(f"Error processing message {message_meta['id']}: {e}")
             error_count += 1
             continue
+        finally:
+            # Free the payload before the next fetch; queued writes keep it until they finish
+            full_message = None
+            message_tracker.finish(
+                message_meta["id"], message_data, failed=error_count > errors_before
+            )
+
+    flush()
+    if scheduler:
+        logger.info(f"Waiting for {scheduler.pending()} scheduled resends to finish...")
+        scheduler.close()
+        resent_count += scheduled_counts["succeeded"]
+        error_count += scheduled_counts["failed"]
 
     return (
         resent_count,
@@ -526,6 +1090,277 @@ def process_emails_batch(
     )  # False indicates normal completion
 
 
+async def process_emails_batch_async(
+    gmail_service,
+    async_service,
+    message_handler,
+    messages,
+    excluded_emails,
+    logger,
+    scheduled_time=None,
+    create_drafts_only=False,
+    concurrency=200,
+    send_ledger=None,
+):
+    """Async counterpart of process_emails_batch for non-interactive runs
+
+    Messages, recipient counts, attachments and writes are requested
+    concurrently, up to `concurrency` at a time, but every message is screened
+    in input order so the per-message decisions match the sync driver. The
+    shared quota limiter paces requests instead of SEND_DELAY.
+
+    Args:
+        gmail_service: Authenticated GmailService, used for large uploads
+        async_service: Open AsyncGmailService
+        messages: List or iterator of message IDs to process
+        concurrency: Maximum requests in flight
+        send_ledger: Optional SendLedger used for recipient counts and
+            cooldowns and updated after every write
+    """
+    resent_count = 0
+    skipped_count = 0
+    error_count = 0
+    processed_recipients = set()
+    use_drafts = create_drafts_only or bool(scheduled_time)
+    # Unfinished writes count toward per-recipient limits, as in the sync driver
+    in_flight = InFlightRecipients(excluded_emails, counted=not use_drafts)
+    # Successful writes per recipient, so counts taken before one finished are refetched
+    finished_writes = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def count_recipient(recipient):
+        """Return (recipient, (count, finished_writes at the time of counting))"""
+        finished = finished_writes.get(recipient, 0)
+        if send_ledger:
+            known = send_ledger.known_count(recipient)
+            if known is not None:
+                return recipient, (known, finished)
+        async with semaphore:
+            found = await async_service.search_messages(
+                f"in:sent to:{recipient}", max_results=100
+            )
+        if send_ledger:
+            count = send_ledger.recipient_count(recipient, lambda: len(found))
+            return recipient, (count, finished)
+        return recipient, (len(found), finished)
+
+    async def current_counts(message_data, recipient_counts):
+        """Refetch counts that were skipped at prefetch or predate a finished write
+
+        Writes can finish while a refetch is awaited, so this repeats until every
+        count is current; screening then runs without yielding to the loop.
+        """
+        while True:
+            stale = {
+                recipient
+                for recipient in message_data["recipients"]
+                if message_handler.validate_email_address(recipient)
+                and recipient not in excluded_emails
+                and recipient_counts.get(recipient, (0, None))[1]
+                != finished_writes.get(recipient, 0)
+            }
+            if not stale:
+                break
+            recipient_counts.update(
+                await asyncio.gather(*(count_recipient(recipient) for recipient in stale))
+            )
+        return {recipient: count for recipient, (count, _) in recipient_counts.items()}
+
+    async def prefetch(message_meta):
+        try:
+            async with semaphore:
+                full_message = await async_service.get_message(
+                    message_meta["id"], format=config.FETCH_FORMAT
+                )
+            if not full_message:
+                return message_meta, None, {}, "retrieve"
+            message_data = message_handler.extract_message_data(full_message)
+            if not message_data:
+                return message_meta, None, {}, "extract"
+            recipient_counts = {}
+            if message_handler.is_job_application(message_data):
+                recipient_counts = dict(
+                    await asyncio.gather(
+                        *(
+                            count_recipient(recipient)
+                            for recipient in message_data["recipients"]
+                            if message_handler.validate_email_address(recipient)
+                            and recipient not in excluded_emails
+                        )
+                    )
+                )
+            return message_meta, message_data, recipient_counts, None
+        except Exception as e:
+            logger.error(f"Error processing message {message_meta['id']}: {e}")
+            return message_meta, None, {}, "exception"
+
+    async def load_attachments(message_data):
+        for attachment_info in message_data["attachments"]:
+            if attachment_info.get("data") is None and attachment_info["attachment_id"]:
+                async with semaphore:
+                    attachment_data = await async_service.get_attachment(
+                        attachment_info["message_id"], attachment_info["attachment_id"]
+                    )
+                if attachment_data:
+                    attachment_info["data"] = base64.urlsafe_b64decode(
+                        attachment_data["data"]
+                    )
+
+    async def write(recipient, message_data, attachments_ready):
+        nonlocal resent_count, error_count
+        result = None
+        try:
+            await attachments_ready
+            resend_message = await asyncio.to_thread(
+                message_handler.create_resend_message, message_data, recipient
+            )
+            if not resend_message:
+                logger.error(f"Could not create resend message for {recipient}")
+                error_count += 1
+                return
+            try:
+                async with semaphore:
+                    if use_drafts:
+                        result = await async_service.create_draft(resend_message)
+                    else:
+                        result = await async_service.send_message(resend_message)
+            finally:
+                message_handler.release_resend_message(resend_message)
+            if not result:
+                logger.error(f"Failed to write resend for {recipient}")
+                error_count += 1
+                return
+            resent_count += 1
+            if create_drafts_only:
+                logger.info(f"Created draft for {recipient} - you can schedule it in Gmail")
+            elif scheduled_time:
+                logger.info(
+                    f"Created draft for scheduled delivery at {scheduled_time.strftime('%Y-%m-%d %H:%M:%S')}"
+                )
+        finally:
+            if result:
+                finished_writes[recipient] = finished_writes.get(recipient, 0) + 1
+            finish_write(
+                recipient,
+                message_data["subject"],
+                result,
+                use_drafts,
+                excluded_emails,
+                logger,
+                send_ledger=send_ledger,
+                in_flight=in_flight,
+            )
+
+    def write_done(task):
+        nonlocal error_count
+        writes.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Error writing resend: {task.exception()}")
+            error_count += 1
+
+    iterator = iter(messages)
+    pending = deque()
+    writes = set()
+
+    async def fill_window():
+        while len(pending) < concurrency:
+            # Streaming iterators may block on search pages; keep that off the loop
+            message_meta = await asyncio.to_thread(next, iterator, None)
+            if message_meta is None:
+                return
+            pending.append(asyncio.ensure_future(prefetch(message_meta)))
+
+    await fill_window()
+    index = 0
+    while pending:
+        message_meta, message_data, recipient_counts, failure = await pending.popleft()
+        await fill_window()
+        index += 1
+        logger.info(f"Processing message {index}")
+
+        if failure:
+            if failure != "exception":
+                logger.warning(f"Could not {failure} message {message_meta['id']}")
+            error_count += 1
+            continue
+
+        if not message_handler.is_job_application(message_data):
+            logger.info(
+                f"Message doesn't appear to be a job application, skipping: {message_data['subject']}"
+            )
+            skipped_count += 1
+            continue
+
+        recipient_counts = await current_counts(message_data, recipient_counts)
+        recipients, rejected_count = screen_recipients(
+            lambda recipient: recipient_counts.get(recipient, 0),
+            message_handler,
+            message_data,
+            excluded_emails,
+            processed_recipients,
+            logger,
+            send_ledger,
+            in_flight,
+        )
+        skipped_count += rejected_count
+        if not recipients:
+            if not message_data["recipients"]:
+                logger.warning(f"No recipient addresses in message {message_data['id']}")
+                skipped_count += 1
+            continue
+
+        attachments_ready = None
+        for recipient in recipients:
+            logger.info(f"Resending application to: {recipient}")
+            logger.info(f"Subject: {message_data['subject']}")
+            if config.DRY_RUN:
+                logger.info("DRY RUN: Would resend message here")
+                resent_count += 1
+                continue
+            if len(writes) >= concurrency:
+                # Each queued write holds its message; wait for room before adding more
+                await asyncio.wait(writes, return_when=asyncio.FIRST_COMPLETED)
+            in_flight.reserve(recipient)
+            if attachments_ready is None:
+                attachments_ready = asyncio.ensure_future(load_attachments(message_data))
+            task = asyncio.ensure_future(write(recipient, message_data, attachments_ready))
+            writes.add(task)
+            task.add_done_callback(write_done)
+
+    if writes:
+        await asyncio.wait(writes)
+
+    return resent_count, skipped_count, error_count, False
+
+
+async def run_async_batch(
+    gmail_service,
+    message_handler,
+    messages,
+    excluded_emails,
+    logger,
+    scheduled_time=None,
+    create_drafts_only=False,
+    send_ledger=None,
+):
+    """Open an AsyncGmailService and run the async batch driver"""
+    async with AsyncGmailService(
+        gmail_service, max_connections=config.ASYNC_MAX_CONNECTIONS
+    ) as async_service:
+        return await process_emails_batch_async(
+            gmail_service,
+            async_service,
+            message_handler,
+            messages,
+            excluded_emails,
+            logger,
+            scheduled_time,
+            create_drafts_only,
+            concurrency=config.ASYNC_CONCURRENCY,
+            send_ledger=send_ledger,
+        )
+
+
 def main():
     """Main function with scheduling support"""
     # Parse command line arguments
@@ -537,11 +1372,27 @@ def main():
         action="store_true",
         help="Execute scheduled email sending (used by Task Scheduler)",
     )
+    parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="Project the quota units and time a run would use without sending anything",
+    )
+    parser.add_argument(
+        "--offline",
+        metavar="PATH",
+        help="Classify and plan resends from a Takeout .mbox file or a directory of .eml files without using the Gmail API",
+    )
     args = parser.parse_args()
 
     logger = setup_logging()
 
-    if args.execute_scheduled:
+    if args.offline:
+        logger.info(f"Planning resends offline from {args.offline}")
+        execute_offline_planning(logger, args.offline)
+    elif args.estimate:
+        logger.info("Estimating the cost of a resend run")
+        execute_estimate(logger)
+    elif args.execute_scheduled:
         # This is a scheduled execution, skip user interaction
         logger.info("Starting scheduled Gmail Job Application Resender")
         execute_email_resending(logger)
@@ -586,6 +1437,73 @@ def main():
         execute_email_resending(logger)
 
 
+def discover_messages(gmail_service, logger):
+    """List the candidate messages for a run using the configured search mode
+
+    Returns a list or a CountingIterator of message stubs, or None if the
+    search found nothing.
+    """
+    keyword_query = " OR ".join([f'"{keyword}"' for keyword in config.JOB_KEYWORDS])
+    search_query = f"in:sent ({keyword_query})"
+    logger.info(f"Searching for sent emails with query: {search_query}")
+    # Ranking lists a larger pool and keeps the best MAX_EMAILS_PER_RUN of it
+    max_results = (
+        config.RANK_POOL_SIZE if config.RANK_CANDIDATES else config.MAX_EMAILS_PER_RUN
+    )
+    if config.SHARDED_SEARCH:
+        logger.info("SHARDED SEARCH - Listing date windows in parallel")
+        planner = SearchPlanner(
+            gmail_service,
+            search_query,
+            datetime.strptime(config.SEARCH_START_DATE, "%Y-%m-%d"),
+            shard_days=config.SEARCH_SHARD_DAYS,
+            max_workers=config.SEARCH_WORKERS,
+            shard_limit=config.SEARCH_SHARD_LIMIT,
+        )
+        messages = CountingIterator(
+            planner.iter_messages(
+                max_results=max_results,
+                newest_first=config.SEARCH_NEWEST_FIRST,
+            )
+        )
+    elif config.STREAMING_MODE:
+        logger.info("STREAMING MODE - Messages are processed as they are listed")
+        messages = CountingIterator(
+            gmail_service.iter_messages(
+                search_query,
+                max_results=max_results,
+                page_size=config.SEARCH_PAGE_SIZE,
+            )
+        )
+    elif config.RANK_CANDIDATES:
+        # The pool can exceed the 500 results one messages.list call returns
+        messages = [
+            {"id": message_id}
+            for message_id in gmail_service.list_message_ids(
+                search_query, max_results=max_results
+            )
+        ]
+        logger.info(f"Listed {len(messages)} candidates for ranking")
+        if not messages:
+            logger.info("No job application emails found in sent folder")
+            return None
+    else:
+        messages = gmail_service.search_messages(
+            search_query, max_results=max_results
+        )
+
+        if not messages:
+            logger.info("No job application emails found in sent folder")
+            return None
+
+    if config.RANK_CANDIDATES:
+        messages = rank_candidates(
+            gmail_service, list(messages), config.MAX_EMAILS_PER_RUN, logger
+        )
+
+    return messages
+
+
 def execute_email_resending(logger, scheduled_time=None, create_drafts_only=False):
     """Execute the email resending process
 
@@ -596,32 +1514,71 @@ def execute_email_resending(logger, scheduled_time=None, create_drafts_only=Fals
     """
     # Load excluded emails
     excluded_emails = load_excluded_emails()
+    memory_monitor = MemoryMonitor(config.MEMORY_BUDGET_MB)
+    gmail_service = None
+    message_handler = None
+    work_queue = None
+    send_ledger = SendLedger(config.SEND_LEDGER_DB) if config.SEND_LEDGER_DB else None
 
     try:
         gmail_service = GmailService()
         gmail_service.authenticate()
         message_handler = MessageHandler(gmail_service)
-        keyword_query = " OR ".join([f'"{keyword}"' for keyword in config.JOB_KEYWORDS])
-        search_query = f"in:sent ({keyword_query})"
-        logger.info(f"Searching for sent emails with query: {search_query}")
-        messages = gmail_service.search_messages(
-            search_query, max_results=config.MAX_EMAILS_PER_RUN
-        )
-
-        if not messages:
-            logger.info("No job application emails found in sent folder")
+        messages = discover_messages(gmail_service, logger)
+        if messages is None:
             return
 
+        if config.WORK_QUEUE_DB:
+            # Every worker enqueues what it found; the queue keeps one copy of each ID
+            work_queue = WorkQueue(
+                config.WORK_QUEUE_DB,
+                lease_seconds=config.WORK_QUEUE_LEASE_SECONDS,
+                max_attempts=config.WORK_QUEUE_MAX_ATTEMPTS,
+            )
+            # Enqueue first: it clears the exclusions of a run that has ended
+            added = work_queue.enqueue(message["id"] for message in messages)
+            work_queue.seed_exclusions(excluded_emails)
+            logger.info(
+                f"WORK QUEUE - Worker {work_queue.worker_id} added {added} new messages to {config.WORK_QUEUE_DB}"
+            )
+            work_queue.start_heartbeat()
+            messages = CountingIterator(
+                work_queue.iter_messages(config.WORK_QUEUE_BATCH_SIZE)
+            )
+
+        if config.ASYNC_MODE and (config.INTERACTIVE_MODE or work_queue):
+            logger.warning(
+                "ASYNC_MODE requires INTERACTIVE_MODE=false and no work queue, using sync processing"
+            )
+
         # Process emails in batch
-        resent_count, skipped_count, error_count, user_quit = process_emails_batch(
-            gmail_service,
-            message_handler,
-            messages,
-            excluded_emails,
-            logger,
-            scheduled_time,
-            create_drafts_only,
-        )
+        if config.ASYNC_MODE and not config.INTERACTIVE_MODE and not work_queue:
+            logger.info("ASYNC MODE - Processing messages from one event loop")
+            resent_count, skipped_count, error_count, user_quit = asyncio.run(
+                run_async_batch(
+                    gmail_service,
+                    message_handler,
+                    messages,
+                    excluded_emails,
+                    logger,
+                    scheduled_time,
+                    create_drafts_only,
+                    send_ledger,
+                )
+            )
+        else:
+            resent_count, skipped_count, error_count, user_quit = process_emails_batch(
+                gmail_service,
+                message_handler,
+                messages,
+                excluded_emails,
+                logger,
+                scheduled_time,
+                create_drafts_only,
+                memory_monitor,
+                work_queue,
+                send_ledger,
+            )
 
         # Print summary (unless user quit early)
         if not user_quit:
@@ -631,7 +1588,12 @@ def execute_email_resending(logger, scheduled_time=None, create_drafts_only=Fals
             else:
                 logger.info("RESEND SUMMARY")
             logger.info("=" * 50)
-            logger.info(f"Total messages found: {len(messages)}")
+            total_found = (
+                messages.count
+                if isinstance(messages, CountingIterator)
+                else len(messages)
+            )
+            logger.info(f"Total messages found: {total_found}")
             if create_drafts_only:
                 logger.info(f"Drafts created: {resent_count}")
             else:
@@ -652,9 +1614,95 @@ def execute_email_resending(logger, scheduled_time=None, create_drafts_only=Fals
     except Exception as e:
         logger.error(f"Fatal error: {e}")
         sys.exit(1)
+    finally:
+        memory_monitor.report()
+        if gmail_service:
+            # Latencies from this run sharpen later --estimate projections
+            gmail_service.metrics.save()
+        if work_queue:
+            logger.info(f"Work queue status: {work_queue.stats()}")
+            work_queue.close()
+        if send_ledger:
+            send_ledger.close()
+        if message_handler:
+            message_handler.close()
 
     logger.info("Gmail Job Application Resender completed")
 
 
+def execute_estimate(logger):
+    """Run discovery and filtering on metadata only and report the projected cost"""
+    excluded_emails = load_excluded_emails()
+    gmail_service = GmailService()
+    send_ledger = SendLedger(config.SEND_LEDGER_DB) if config.SEND_LEDGER_DB else None
+    try:
+        gmail_service.authenticate()
+        message_handler = MessageHandler(gmail_service)
+        messages = discover_messages(gmail_service, logger)
+        if messages is None:
+            return
+        estimator = CostEstimator(
+            gmail_service, message_handler, excluded_emails, send_ledger
+        )
+        estimator.report(estimator.estimate(list(messages)))
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+        sys.exit(1)
+    finally:
+        gmail_service.metrics.save()
+        if send_ledger:
+            send_ledger.close()
+
+
+def execute_offline_planning(logger, path):
+    """Classify an offline archive and report which resends a run would make
+
+    Uses the same classification, exclusion and per-recipient limits as
+    execute_email_resending, counting earlier emails from the archive itself.
+    """
+    excluded_emails = load_excluded_emails()
+    message_handler = MessageHandler(None)
+    source = open_offline_source(path, message_handler)
+    try:
+        # First pass over headers only: how often each address appears in sent mail
+        recipient_counts = {}
+        for record in source.iter_records(label="Sent"):
+            for recipient in record.recipients:
+                recipient_counts[recipient] = recipient_counts.get(recipient, 0) + 1
+
+        sent_count = 0
+        application_count = 0
+        planned = []
+        processed_recipients = set()
+        for record in source.iter_records(label="Sent"):
+            sent_count += 1
+            if not message_handler.is_job_application(record):
+                continue
+            application_count += 1
+            recipients, _ = screen_recipients(
+                lambda recipient: recipient_counts.get(recipient, 0),
+                message_handler,
+                record,
+                excluded_emails,
+                processed_recipients,
+                logger,
+            )
+            planned.extend((recipient, record.subject) for recipient in recipients)
+            if len(planned) >= config.MAX_EMAILS_PER_RUN:
+                planned = planned[: config.MAX_EMAILS_PER_RUN]
+                break
+    finally:
+        source.close()
+
+    logger.info("\n" + "=" * 50)
+    logger.info("OFFLINE PLAN SUMMARY")
+    logger.info("=" * 50)
+    logger.info(f"Sent messages scanned: {sent_count}")
+    logger.info(f"Job applications found: {application_count}")
+    logger.info(f"Resends planned: {len(planned)}")
+    for recipient, subject in planned:
+        logger.info(f"  {recipient}: {subject}")
+
+
 if __name__ == "__main__":
     main()
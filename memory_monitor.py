@@ -0,0 +1,78 @@
+import gc
+import logging
+import os
+import sys
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class MemoryMonitor:
+    """Track process memory against a budget and report the peak for a run"""
+
+    def __init__(self, budget_mb):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.logger = logging.getLogger(__name__)
+        self._peak = 0
+        # Without /proc or getrusage fall back to tracing Python allocations
+        self._use_tracemalloc = resource is None and not os.path.exists(
+            "/proc/self/statm"
+        )
+        if self._use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def current_bytes(self):
+        """Return the current resident set size in bytes"""
+        if self._use_tracemalloc:
+            return tracemalloc.get_traced_memory()[0]
+        try:
+            with open("/proc/self/statm", "r") as f:
+                resident_pages = int(f.read().split()[1])
+            return resident_pages * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return self._rusage_peak_bytes()
+
+    def _rusage_peak_bytes(self):
+        if resource is None:
+            return tracemalloc.get_traced_memory()[1]
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    def peak_bytes(self):
+        """Return the highest memory usage observed so far"""
+        self._peak = max(self._peak, self.current_bytes())
+        if self._use_tracemalloc:
+            return max(self._peak, tracemalloc.get_traced_memory()[1])
+        return max(self._peak, self._rusage_peak_bytes())
+
+    def check(self):
+        """Record usage and reclaim garbage when the budget is exceeded.
+
+        Returns True while the process stays within its budget.
+        """
+        current = self.current_bytes()
+        self._peak = max(self._peak, current)
+        if current <= self.budget_bytes:
+            return True
+        gc.collect()
+        current = self.current_bytes()
+        if current > self.budget_bytes:
+            self.logger.warning(
+                f"Memory usage {current / 1048576:.1f} MB exceeds budget of "
+                f"{self.budget_bytes / 1048576:.1f} MB"
+            )
+            return False
+        return True
+
+    def report(self):
+        """Log the peak memory usage for this run"""
+        peak_mb = self.peak_bytes() / 1048576
+        self.logger.info(
+            f"Peak memory usage: {peak_mb:.1f} MB "
+            f"(budget: {self.budget_bytes / 1048576:.1f} MB)"
+        )
+        return peak_mb
@@ -1,60 +1,159 @@
 import base64
 import logging
-import re
-from email import encoders
-from email.mime.base import MIMEBase
+import os
+import uuid
+from email import policy
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from email.parser import BytesHeaderParser, BytesParser
 
+import address_utils
 import config
+from html_text import html_to_text, iter_base64_text, iter_text_chunks
+from message_record import MessageRecord
+from mime_cache import EncodedPartCache
+from mime_pool import (
+    MimeBuildPool,
+    encode_attachment_part,
+    iter_spliced_chunks,
+    spool_chunks,
+)
+
+
+def find_header_end(data, start=0, end=None):
+    """Offset just past the blank line that ends the header block, or end if none"""
+    end = len(data) if end is None else end
+    header_end = end
+    for separator in (b"\n\n", b"\r\n\r\n"):
+        position = data.find(separator, start, end)
+        if position != -1:
+            header_end = min(header_end, position + len(separator))
+    return header_end
 
 
 class MessageHandler:
     def __init__(self, gmail_service):
         self.gmail_service = gmail_service
         self.logger = logging.getLogger(__name__)
+        self.part_cache = EncodedPartCache(config.MIME_PART_CACHE_MB * 1024 * 1024)
+        self.build_pool = (
+            MimeBuildPool(
+                config.MIME_BUILD_PROCESSES, config.MIME_PART_CACHE_MB * 1024 * 1024
+            )
+            if config.MIME_BUILD_PROCESSES > 0
+            else None
+        )
 
     def clean_email(self, email):
         """Removes mailto, Markdown, brackets, and whitespace from an email string."""
-        if not email:
-            return ""
-        # Remove Markdown hyperlinks: [text](mailto:email@example.com)
-        mailto_match = re.search(
-            r"mailto:([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,})", email
-        )
-        if mailto_match:
-            email = mailto_match.group(1)
-        # Remove mailto: prefix if present
-        if email.startswith("mailto:"):
-            email = email[7:]
-        # Remove brackets, extra symbols, whitespace
-        email = email.strip("<>[]()").replace(" ", "").replace("\n", "")
-        # Remove any lingering Markdown or URI artifacts
-        email = email.replace("mailto:", "")
-        return email
+        return address_utils.normalize_address(email)
+
+    def parse_recipients(self, header):
+        """Return every normalized recipient address in an address header"""
+        return address_utils.parse_recipients(header)
 
     def extract_message_data(self, message):
-        """Extract relevant data from a Gmail message"""
+        """Extract relevant data from a Gmail message.
+
+        Headers are parsed immediately; the body and attachment list are
+        decoded on first access. Messages fetched with format="raw" are
+        parsed locally from their RFC 822 bytes.
+        """
+        if "raw" in message:
+            return self.extract_raw_message_data(message)
         try:
             headers = {}
             for header in message["payload"]["headers"]:
                 headers[header["name"].lower()] = header["value"]
-            # Use clean_email on the TO field
-            to_field = self.clean_email(headers.get("to", ""))
-            return {
-                "id": message["id"],
-                "to": to_field,
-                "subject": headers.get("subject", "(No Subject)"),
-                "date": headers.get("date", ""),
-                "body": self._extract_body(message["payload"]),
-                "attachments": self._extract_attachments(
-                    message["payload"], message["id"]
+            recipients = self.parse_recipients(headers.get("to", ""))
+            payload = message["payload"]
+            message_id = message["id"]
+            return MessageRecord(
+                id=message_id,
+                to=", ".join(recipients),
+                recipients=recipients,
+                subject=headers.get("subject", "(No Subject)"),
+                date=headers.get("date", ""),
+                body_loader=lambda: self._load_body(self._extract_body, payload),
+                attachments_loader=lambda: self._load_attachments(
+                    self._extract_attachments, payload, message_id
                 ),
-            }
+            )
         except Exception as e:
             self.logger.error(f"Error extracting message data: {e}")
             return None
 
+    def extract_raw_message_data(self, message):
+        """Extract message data from a Gmail message fetched with format="raw".
+
+        Attachments come back with their bytes inline, so resending them needs
+        no attachments.get calls.
+        """
+        try:
+            raw_bytes = base64.urlsafe_b64decode(message["raw"])
+        except Exception as e:
+            self.logger.error(f"Error decoding raw message {message.get('id')}: {e}")
+            return None
+        return self.extract_mime_data(message["id"], lambda: raw_bytes)
+
+    def extract_mime_data(self, message_id, raw_loader, header_loader=None):
+        """Extract the same fields as extract_message_data from RFC 822 bytes.
+
+        raw_loader returns the message bytes and header_loader, if given, just
+        the header block. Only the headers are parsed up front; the full MIME
+        tree is parsed once the body or attachments are first needed.
+        """
+        try:
+            if header_loader:
+                header_bytes = header_loader()
+            else:
+                raw_bytes = raw_loader()
+                header_bytes = raw_bytes[: find_header_end(raw_bytes)]
+                del raw_bytes
+            headers = BytesHeaderParser(policy=policy.default).parsebytes(header_bytes)
+            recipients = self.parse_recipients(str(headers.get("to", "")))
+            parsed = []
+
+            def parse():
+                if not parsed:
+                    parsed.append(
+                        BytesParser(policy=policy.default).parsebytes(raw_loader())
+                    )
+                return parsed[0]
+
+            return MessageRecord(
+                id=message_id,
+                to=", ".join(recipients),
+                recipients=recipients,
+                subject=str(headers.get("subject") or "(No Subject)"),
+                date=str(headers.get("date") or ""),
+                body_loader=lambda: self._load_body(self._extract_mime_body, parse()),
+                attachments_loader=lambda: self._load_attachments(
+                    self._extract_mime_attachments, parse(), message_id
+                ),
+            )
+        except Exception as e:
+            self.logger.error(f"Error extracting MIME message data: {e}")
+            return None
+
+    def _load_body(self, extract, source):
+        try:
+            return extract(source)
+        except Exception as e:
+            self.logger.error(f"Error extracting message body: {e}")
+            return ""
+
+    def _load_attachments(self, extract, source, message_id):
+        try:
+            return extract(source, message_id)
+        except Exception as e:
+            self.logger.error(f"Error extracting message attachments: {e}")
+            return []
+
+    def _html_to_text(self, html_chunks):
+        """Convert HTML (a string or iterable of chunks) to text within the body budget"""
+        return html_to_text(html_chunks, config.HTML_BODY_CHAR_BUDGET or None)
+
     def _extract_body(self, payload):
         """Extract plain text body from message payload"""
         body = ""
@@ -85,12 +184,8 @@ class MessageHandler:
                     and "data" in part["body"]
                     and not body
                 ):
-                    html_body = base64.urlsafe_b64decode(part["body"]["data"]).decode(
-                        "utf-8", errors="ignore"
-                    )
-                    # Simple HTML to text conversion (remove tags)
-                    body = re.sub(r"<[^>]+>", "", html_body)
-                    body = re.sub(r"\s+", " ", body).strip()
+                    # Decoded piece by piece so a long document stops at the budget
+                    body = self._html_to_text(iter_base64_text(part["body"]["data"]))
                     self.logger.debug(
                         f"Extracted HTML body and converted to text (length: {len(body)})"
                     )
@@ -112,12 +207,7 @@ class MessageHandler:
             self.logger.debug(f"Extracted simple plain text body (length: {len(body)})")
 
         elif payload["mimeType"] == "text/html" and "data" in payload["body"]:
-            html_body = base64.urlsafe_b64decode(payload["body"]["data"]).decode(
-                "utf-8", errors="ignore"
-            )
-            # Simple HTML to text conversion
-            body = re.sub(r"<[^>]+>", "", html_body)
-            body = re.sub(r"\s+", " ", body).strip()
+            body = self._html_to_text(iter_base64_text(payload["body"]["data"]))
             self.logger.debug(
                 f"Extracted simple HTML body and converted to text (length: {len(body)})"
             )
@@ -128,30 +218,76 @@ class MessageHandler:
         return body
 
     def _extract_attachments(self, payload, message_id):
-        """Extract attachment information from message payload"""
+        """Extract attachment information from message payload, including nested parts"""
         attachments = []
-        if "parts" in payload:
-            for part in payload["parts"]:
-                if part.get("filename"):
-                    attachment_info = {
-                        "filename": part["filename"],
-                        "mime_type": part["mimeType"],
-                        "attachment_id": part["body"].get("attachmentId"),
+        for part in payload.get("parts", []):
+            if part.get("filename"):
+                attachment_info = {
+                    "filename": part["filename"],
+                    "mime_type": part["mimeType"],
+                    "attachment_id": part["body"].get("attachmentId"),
+                    "size": part["body"].get("size", 0),
+                    "message_id": message_id,
+                }
+                attachments.append(attachment_info)
+            elif "parts" in part:
+                attachments.extend(self._extract_attachments(part, message_id))
+        return attachments
+
+    def _decode_mime_text(self, part):
+        payload = part.get_payload(decode=True) or b""
+        charset = part.get_content_charset() or "utf-8"
+        try:
+            return payload.decode(charset, errors="ignore")
+        except LookupError:
+            return payload.decode("utf-8", errors="ignore")
+
+    def _extract_mime_body(self, msg):
+        """Extract plain text body from a parsed MIME message"""
+        part = msg.get_body(preferencelist=("plain", "html"))
+        if part is None:
+            self.logger.warning("No body content extracted from message")
+            return ""
+        body = self._decode_mime_text(part)
+        if part.get_content_type() == "text/html":
+            body = self._html_to_text(iter_text_chunks(body))
+        self.logger.debug(
+            f"Extracted {part.get_content_type()} body from MIME (length: {len(body)})"
+        )
+        return body
+
+    def _extract_mime_attachments(self, msg, message_id):
+        """Extract attachments, with their decoded bytes, from a parsed MIME message"""
+        attachments = []
+        for part in msg.walk():
+            if part.is_multipart():
+                continue
+            filename = part.get_filename()
+            if filename:
+                data = part.get_payload(decode=True) or b""
+                attachments.append(
+                    {
+                        "filename": filename,
+                        "mime_type": part.get_content_type(),
+                        "attachment_id": None,
+                        "size": len(data),
                         "message_id": message_id,
+                        "data": data,
                     }
-                    attachments.append(attachment_info)
+                )
         return attachments
 
-    def create_resend_message(self, original_data):
-        """Create a new message for resending"""
+    def create_resend_message(self, original_data, recipient=None):
+        """Create a new message for resending, optionally to a single recipient"""
         try:
-            # Create multipart message
-            msg = MIMEMultipart()
-            msg["To"] = original_data["to"]
+            to_address = recipient or original_data["to"]
+            # Create multipart message with a known boundary for splicing parts
+            msg = MIMEMultipart(boundary=f"==============={uuid.uuid4().hex}==")
+            msg["To"] = to_address
             msg["Subject"] = f"{config.RESEND_PREFIX} {original_data['subject']}"
 
             # Debug logging
-            self.logger.info(f"Creating resend message for: {original_data['to']}")
+            self.logger.info(f"Creating resend message for: {to_address}")
             self.logger.info(f"Original subject: {original_data['subject']}")
             self.logger.info(
                 f"Original body length: {len(original_data.get('body', ''))}"
@@ -162,7 +298,7 @@ class MessageHandler:
             if not original_body:
                 original_body = "[Original message content could not be extracted]"
                 self.logger.warning(
-                    f"Empty body for message to {original_data['to']}, using placeholder"
+                    f"Empty body for message to {to_address}, using placeholder"
                 )
 
             # Compose body with resend message
@@ -173,58 +309,127 @@ class MessageHandler:
 
             msg.attach(MIMEText(full_body, "plain"))
 
-            # Add attachments if any
-            attachment_count = 0
-            for attachment_info in original_data["attachments"]:
-                if attachment_info["attachment_id"]:
-                    attachment_data = self.gmail_service.get_attachment(
-                        attachment_info["message_id"], attachment_info["attachment_id"]
-                    )
-                    if attachment_data:
-                        file_data = base64.urlsafe_b64decode(attachment_data["data"])
-                        part = MIMEBase("application", "octet-stream")
-                        part.set_payload(file_data)
-                        encoders.encode_base64(part)
-                        filename = attachment_info["filename"]
-                        part.add_header(
-                            "Content-Disposition",
-                            f'attachment; filename="{filename}"',
-                        )
-                        msg.attach(part)
-                        attachment_count += 1
-                        self.logger.debug(f"Added attachment: {filename}")
+            estimated_size = sum(
+                attachment.get("size", 0) for attachment in original_data["attachments"]
+            )
+            spool = estimated_size > config.LARGE_MESSAGE_THRESHOLD_MB * 1024 * 1024
+            if spool:
+                self.logger.info(
+                    f"Attachments total {estimated_size} bytes, spooling message to disk"
+                )
+            if self.build_pool:
+                return self._build_in_pool(msg, original_data["attachments"], spool)
 
-            self.logger.info(f"Created message with {attachment_count} attachments")
+            # Attachments are spliced in one at a time so only one is held at once
+            chunks = self._iter_message_chunks(msg, original_data["attachments"])
+            if spool:
+                return {"spool_path": self._spool_message(chunks)}
 
             # Convert to raw format for Gmail API
-            raw_message = base64.urlsafe_b64encode(msg.as_bytes()).decode("utf-8")
+            message_bytes = b"".join(chunks)
+            del msg
+            raw_message = base64.urlsafe_b64encode(message_bytes).decode("utf-8")
+            del message_bytes
             return {"raw": raw_message}
         except Exception as e:
             self.logger.error(f"Error creating resend message: {e}")
             return None
 
+    def _split_message(self, msg):
+        """Serialize msg and split it around its closing boundary for splicing"""
+        boundary = msg.get_boundary().encode("ascii")
+        head, closing, tail = msg.as_bytes().rpartition(b"\n--" + boundary + b"--")
+        return head, closing + tail, boundary
+
+    def _iter_attachment_payloads(self, attachments):
+        """Yield (filename, payload, is_base64) for each attachment, fetching as needed"""
+        for attachment_info in attachments:
+            if attachment_info.get("data") is not None:
+                # Parsed from raw or offline messages, the bytes are already here
+                yield attachment_info["filename"], attachment_info["data"], False
+            elif attachment_info["attachment_id"]:
+                attachment_data = self.gmail_service.get_attachment(
+                    attachment_info["message_id"], attachment_info["attachment_id"]
+                )
+                if not attachment_data:
+                    continue
+                # Left base64url-encoded; decoding is up to the consumer
+                yield (
+                    attachment_info["filename"],
+                    attachment_data.pop("data").encode("ascii"),
+                    True,
+                )
+                del attachment_data
+
+    def _iter_message_chunks(self, msg, attachments):
+        """Yield the serialized message, splicing in each attachment part as it is fetched"""
+        head, closing, boundary = self._split_message(msg)
+        attachment_count = 0
+
+        def parts():
+            nonlocal attachment_count
+            for filename, file_data, is_base64 in self._iter_attachment_payloads(
+                attachments
+            ):
+                if is_base64:
+                    # Drop each intermediate copy as soon as the next one exists
+                    file_data = base64.urlsafe_b64decode(file_data)
+                # Repeated attachments reuse their already-encoded part
+                part_bytes = self.part_cache.get_or_encode(
+                    file_data, filename, encode_attachment_part
+                )
+                del file_data
+                yield part_bytes
+                del part_bytes
+                attachment_count += 1
+                self.logger.debug(f"Added attachment: {filename}")
+
+        yield from iter_spliced_chunks(head, closing, boundary, parts())
+        self.logger.info(f"Created message with {attachment_count} attachments")
+
+    def _build_in_pool(self, msg, attachments, spool):
+        """Decode, encode and serialize the message in the MIME build pool"""
+        head, closing, boundary = self._split_message(msg)
+        del msg
+        # Each payload moves into shared memory as soon as it has been fetched
+        message = self.build_pool.build(
+            head, closing, boundary, self._iter_attachment_payloads(attachments), spool
+        )
+        self.logger.info("Created message in MIME build worker")
+        return message
+
+    def _spool_message(self, chunks):
+        """Write message chunks to a temporary file and return its path"""
+        spool_path = spool_chunks(chunks)
+        self.logger.debug(f"Spooled message to {spool_path}")
+        return spool_path
+
+    def close(self):
+        """Stop the MIME build pool, if one was started"""
+        if self.build_pool:
+            self.build_pool.shutdown()
+
+    def release_resend_message(self, resend_message):
+        """Remove the spool file behind a large resend message, if any"""
+        spool_path = resend_message.get("spool_path") if resend_message else None
+        if spool_path and os.path.exists(spool_path):
+            os.remove(spool_path)
+
     def is_job_application(self, message_data):
         subject = message_data["subject"].lower()
+        # Check the subject first so the body is only decoded when needed
+        for keyword in config.JOB_KEYWORDS:
+            if keyword in subject:
+                return True
         body = message_data["body"].lower()
         for keyword in config.JOB_KEYWORDS:
-            if keyword in subject or keyword in body:
+            if keyword in body:
                 return True
-        job_patterns = [
-            "dear hiring manager",
-            "dear recruiter",
-            "i am writing to apply",
-            "application for",
-            "interested in the position",
-            "attached resume",
-            "cover letter",
-        ]
-        for pattern in job_patterns:
+        for pattern in config.JOB_PATTERNS:
             if pattern in body:
                 return True
         return False
 
     def validate_email_address(self, email):
         """Basic email validation with cleaning step included."""
-        email = self.clean_email(email)
-        pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        return re.match(pattern, email) is not None
+        return address_utils.is_valid_address(self.clean_email(email))
@@ -0,0 +1,85 @@
+import threading
+
+
+class MessageRecord:
+    """Compact record for a parsed message.
+
+    Header fields are set up front; the body text and attachment list are
+    produced by loader callables on first access and cached, so messages
+    rejected by the filters never pay for decoding. Item access
+    (``record["to"]``, ``record.get("body", "")``) is kept for code that
+    treats message data as a dict. Loading is locked, as scheduler workers
+    and worker threads may build resends for the same message at once.
+    """
+
+    __slots__ = (
+        "id",
+        "to",
+        "recipients",
+        "subject",
+        "date",
+        "_body",
+        "_attachments",
+        "_body_loader",
+        "_attachments_loader",
+        "_lock",
+    )
+
+    _FIELDS = ("id", "to", "recipients", "subject", "date", "body", "attachments")
+
+    def __init__(
+        self, id, to, recipients, subject, date, body_loader, attachments_loader
+    ):
+        self.id = id
+        self.to = to
+        self.recipients = recipients
+        self.subject = subject
+        self.date = date
+        self._body = None
+        self._attachments = None
+        self._body_loader = body_loader
+        self._attachments_loader = attachments_loader
+        self._lock = threading.Lock()
+
+    @property
+    def body(self):
+        if self._body is None:
+            with self._lock:
+                if self._body is None:
+                    self._body = self._body_loader()
+                    self._body_loader = None
+        return self._body
+
+    @property
+    def attachments(self):
+        if self._attachments is None:
+            with self._lock:
+                if self._attachments is None:
+                    self._attachments = self._attachments_loader()
+                    self._attachments_loader = None
+        return self._attachments
+
+    def release(self):
+        """Drop decoded content and loaders so the source payload can be freed"""
+        with self._lock:
+            self._body = ""
+            self._attachments = []
+            self._body_loader = None
+            self._attachments_loader = None
+
+    def __getitem__(self, key):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self._FIELDS
+
+    def __repr__(self):
+        return f"MessageRecord(id={self.id!r}, to={self.to!r}, subject={self.subject!r})"
@@ -0,0 +1,51 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+
+class EncodedPartCache:
+    """LRU cache of serialized MIME attachment parts keyed by content hash and filename.
+
+    Stores the complete part bytes (headers plus base64 body) so repeated
+    attachments such as the same resume can be spliced into new messages
+    without encoding them again. Size is bounded by total cached bytes.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._parts = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_encode(self, data, filename, encode):
+        """Return cached part bytes for data/filename, calling encode(data, filename) on a miss"""
+        key = (hashlib.sha256(data).hexdigest(), filename)
+        with self._lock:
+            part_bytes = self._parts.get(key)
+            if part_bytes is not None:
+                self._parts.move_to_end(key)
+                self.hits += 1
+                return part_bytes
+            self.misses += 1
+
+        part_bytes = encode(data, filename)
+        if len(part_bytes) > self.max_bytes:
+            return part_bytes
+
+        with self._lock:
+            if key not in self._parts:
+                self._parts[key] = part_bytes
+                self._size += len(part_bytes)
+                while self._size > self.max_bytes:
+                    _, evicted = self._parts.popitem(last=False)
+                    self._size -= len(evicted)
+        return part_bytes
+
+    def clear(self):
+        with self._lock:
+            self._parts.clear()
+            self._size = 0
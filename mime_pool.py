@@ -0,0 +1,145 @@
+import base64
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from email import encoders
+from email.mime.base import MIMEBase
+from multiprocessing.shared_memory import SharedMemory
+
+from mime_cache import EncodedPartCache
+
+# Part cache of the current worker process, set up by _init_worker
+_worker_cache = None
+
+
+def encode_attachment_part(file_data, filename):
+    """Serialize one attachment as a base64-encoded MIME part"""
+    part = MIMEBase("application", "octet-stream")
+    part.set_payload(file_data)
+    encoders.encode_base64(part)
+    part.add_header(
+        "Content-Disposition",
+        f'attachment; filename="{filename}"',
+    )
+    return part.as_bytes()
+
+
+def iter_spliced_chunks(head, closing, boundary, parts):
+    """Yield a serialized multipart message with each part bytes spliced in before closing"""
+    yield head
+    for part_bytes in parts:
+        yield b"\n--" + boundary + b"\n" + part_bytes
+    yield closing
+
+
+def spool_chunks(chunks):
+    """Write message chunks to a temporary file and return its path"""
+    fd, spool_path = tempfile.mkstemp(prefix="resend_", suffix=".eml")
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            for chunk in chunks:
+                spool.write(chunk)
+    except Exception:
+        os.remove(spool_path)
+        raise
+    return spool_path
+
+
+def _init_worker(cache_bytes):
+    global _worker_cache
+    _worker_cache = EncodedPartCache(cache_bytes)
+
+
+def _read_attachment(name, length, is_base64):
+    block = SharedMemory(name=name)
+    try:
+        data = bytes(block.buf[:length])
+    finally:
+        block.close()
+    return base64.urlsafe_b64decode(data) if is_base64 else data
+
+
+def _iter_worker_parts(attachments):
+    for name, length, is_base64, filename in attachments:
+        file_data = _read_attachment(name, length, is_base64)
+        yield _worker_cache.get_or_encode(file_data, filename, encode_attachment_part)
+        del file_data
+
+
+def build_payload(head, closing, boundary, attachments, spool):
+    """Assemble a resend message in a worker process.
+
+    attachments is a list of (shared memory name, length, is_base64, filename)
+    tuples; base64url data from the Gmail API is decoded here. Returns the
+    Gmail request body: {"raw": ...}, or {"spool_path": ...} when spooling.
+    """
+    chunks = iter_spliced_chunks(
+        head, closing, boundary, _iter_worker_parts(attachments)
+    )
+    if spool:
+        return {"spool_path": spool_chunks(chunks)}
+    return {"raw": base64.urlsafe_b64encode(b"".join(chunks)).decode("ascii")}
+
+
+class MimeBuildPool:
+    """Process pool that decodes, encodes and serializes resend messages.
+
+    Base64 work on multi-MB attachments holds the GIL, so with several
+    threads or an event loop building messages the main process becomes the
+    bottleneck. Here every attachment payload is copied once into its own
+    shared memory block and workers do all decoding and encoding, returning
+    the ready request body. Each worker keeps its own encoded part cache.
+    Throughput scales with cores when several builds are in flight, as with
+    DOMAIN_SCHEDULER or ASYNC_MODE.
+    """
+
+    def __init__(self, processes, cache_bytes):
+        self.processes = processes
+        self.cache_bytes = cache_bytes
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # The pool is often first used from a scheduler thread; forking a
+                # threaded process can leave a lock held forever in the child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.cache_bytes,),
+                )
+            return self._executor
+
+    def build(self, head, closing, boundary, payloads, spool=False):
+        """Build a message in a worker from an iterable of (filename, payload, is_base64)"""
+        blocks = []
+        try:
+            attachments = []
+            for filename, payload, is_base64 in payloads:
+                block = SharedMemory(create=True, size=max(len(payload), 1))
+                blocks.append(block)
+                block.buf[: len(payload)] = payload
+                attachments.append((block.name, len(payload), is_base64, filename))
+                # Shared memory now holds the only copy
+                del payload
+            self.logger.debug(f"Building message with {len(attachments)} attachments")
+            future = self._get_executor().submit(
+                build_payload, head, closing, boundary, attachments, spool
+            )
+            return future.result()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
@@ -0,0 +1,182 @@
+import logging
+import mmap
+import os
+import re
+from email import policy
+from email.parser import BytesHeaderParser
+
+from message_handler import find_header_end
+
+# Takeout writes the decimal Gmail message ID into each "From " separator line
+TAKEOUT_FROM_PATTERN = re.compile(rb"^From (\d+)@xxx ")
+
+
+class MboxSource:
+    """Read messages from a Google Takeout .mbox without the Gmail API.
+
+    The file is memory-mapped and message offsets are indexed in a single
+    pass; individual messages are only sliced out and parsed on demand.
+    """
+
+    def __init__(self, path, message_handler):
+        self.path = path
+        self.message_handler = message_handler
+        self.logger = logging.getLogger(__name__)
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = []
+        self._ids = {}
+        self._has_labels = None
+        self._index()
+
+    def _index(self):
+        if self._map[:5] == b"From ":
+            position = 0
+        else:
+            position = self._map.find(b"\nFrom ")
+            if position != -1:
+                position += 1
+        while position != -1:
+            line_end = self._map.find(b"\n", position)
+            if line_end == -1:
+                break
+            next_from = self._map.find(b"\nFrom ", line_end)
+            end = len(self._map) if next_from == -1 else next_from + 1
+            match = TAKEOUT_FROM_PATTERN.match(self._map[position:line_end])
+            if match:
+                message_id = format(int(match.group(1)), "x")
+            else:
+                message_id = f"mbox-{len(self._offsets)}"
+            self._ids[message_id] = len(self._offsets)
+            self._offsets.append((message_id, line_end + 1, end))
+            position = -1 if next_from == -1 else next_from + 1
+        self.logger.info(f"Indexed {len(self._offsets)} messages in {self.path}")
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _raw_loader(self, start, end):
+        # Undo the ">From " quoting applied to body lines by the mbox writer
+        return lambda: self._map[start:end].replace(b"\n>From ", b"\nFrom ")
+
+    def _header_loader(self, start, end):
+        return lambda: self._map[start : find_header_end(self._map, start, end)]
+
+    def _labels(self, start, end):
+        headers = BytesHeaderParser(policy=policy.compat32).parsebytes(
+            self._header_loader(start, end)()
+        )
+        labels = headers.get("X-Gmail-Labels")
+        if labels is None:
+            return set()
+        return {label.strip().lower() for label in labels.split(",")}
+
+    def has_labels(self):
+        """True if any message carries the X-Gmail-Labels header Takeout adds"""
+        if self._has_labels is None:
+            self._has_labels = any(
+                self._labels(start, end) for _, start, end in self._offsets
+            )
+            if not self._has_labels:
+                self.logger.warning(
+                    f"{self.path} has no X-Gmail-Labels headers; label filters are ignored"
+                )
+        return self._has_labels
+
+    def get_record(self, message_id):
+        """Return the MessageRecord for one message ID, or None if unknown"""
+        index = self._ids.get(message_id)
+        if index is None:
+            return None
+        _, start, end = self._offsets[index]
+        return self.message_handler.extract_mime_data(
+            message_id, self._raw_loader(start, end), self._header_loader(start, end)
+        )
+
+    def iter_records(self, label=None):
+        """Yield a MessageRecord per message, optionally only those with a Gmail label.
+
+        Archives without X-Gmail-Labels headers cannot be filtered, so every
+        message is yielded for them.
+        """
+        if label and not self.has_labels():
+            label = None
+        for message_id, start, end in self._offsets:
+            if label and label.lower() not in self._labels(start, end):
+                continue
+            record = self.message_handler.extract_mime_data(
+                message_id,
+                self._raw_loader(start, end),
+                self._header_loader(start, end),
+            )
+            if record:
+                yield record
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class EmlDirectorySource:
+    """Read messages from a directory of .eml files without the Gmail API"""
+
+    def __init__(self, path, message_handler):
+        self.path = path
+        self.message_handler = message_handler
+        self.logger = logging.getLogger(__name__)
+        self._files = {
+            os.path.splitext(name)[0]: os.path.join(path, name)
+            for name in sorted(os.listdir(path))
+            if name.lower().endswith(".eml")
+        }
+        self.logger.info(f"Found {len(self._files)} .eml files in {path}")
+
+    def __len__(self):
+        return len(self._files)
+
+    def _raw_loader(self, file_path):
+        def load():
+            with open(file_path, "rb") as f:
+                return f.read()
+
+        return load
+
+    def _header_loader(self, file_path):
+        def load():
+            lines = []
+            with open(file_path, "rb") as f:
+                for line in f:
+                    lines.append(line)
+                    if line in (b"\n", b"\r\n"):
+                        break
+            return b"".join(lines)
+
+        return load
+
+    def get_record(self, message_id):
+        """Return the MessageRecord for one message ID, or None if unknown"""
+        file_path = self._files.get(message_id)
+        if file_path is None:
+            return None
+        return self.message_handler.extract_mime_data(
+            message_id, self._raw_loader(file_path), self._header_loader(file_path)
+        )
+
+    def iter_records(self, label=None):
+        """Yield a MessageRecord per file; labels are not stored in .eml files"""
+        for message_id, file_path in self._files.items():
+            record = self.message_handler.extract_mime_data(
+                message_id, self._raw_loader(file_path), self._header_loader(file_path)
+            )
+            if record:
+                yield record
+
+    def close(self):
+        pass
+
+
+def open_offline_source(path, message_handler):
+    """Open an .mbox file or a directory of .eml files as a message source"""
+    if os.path.isdir(path):
+        return EmlDirectorySource(path, message_handler)
+    return MboxSource(path, message_handler)
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+
+# Gmail API quota units charged per method
+QUOTA_COSTS = {
+    "messages.list": 5,
+    "messages.get": 5,
+    "messages.attachments.get": 5,
+    "messages.send": 100,
+    "drafts.create": 10,
+    "drafts.send": 100,
+}
+
+
+class QuotaLimiter:
+    """Token bucket over Gmail quota units, shared by threads and event loops.
+
+    Callers reserve units up front; the bucket may go into debt, and the
+    caller then waits until the debt has been repaid at the configured rate.
+    """
+
+    def __init__(self, units_per_second, burst=None):
+        self.rate = units_per_second
+        self.capacity = burst if burst is not None else units_per_second
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, units):
+        """Take units from the bucket and return how long to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= units
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, units):
+        """Block the calling thread until units are available"""
+        wait = self._reserve(units)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, units):
+        """Wait in the event loop until units are available"""
+        wait = self._reserve(units)
+        if wait > 0:
+            await asyncio.sleep(wait)
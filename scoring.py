@@ -0,0 +1,69 @@
+import heapq
+import time
+
+import numpy as np
+
+# Order of the feature columns and of the weight vector
+FEATURES = ("subject_keywords", "body_keywords", "body_patterns", "age")
+
+
+def term_matrix(texts, terms):
+    """Return an (len(texts), len(terms)) uint8 matrix of substring hits"""
+    return np.fromiter(
+        (term in text for text in texts for term in terms),
+        dtype=np.uint8,
+        count=len(texts) * len(terms),
+    ).reshape(len(texts), len(terms))
+
+
+class CandidateScorer:
+    """Score a whole batch of resend candidates at once with NumPy.
+
+    Subjects and bodies are turned into keyword and phrase hit matrices, the
+    hit counts are saturated with log1p and combined with an age factor into
+    an (n, 4) feature matrix, and the score is its product with the weight
+    vector. The age factor rises to 1 at age_peak_days (a reply may still be
+    on its way before that) and then halves every age_half_life_days.
+
+    Args:
+        keywords: Terms looked for in both subject and body
+        patterns: Phrases looked for in the body only
+        weights: Dict of weight per name in FEATURES
+        age_peak_days: Age since sending at which a resend is most useful
+        age_half_life_days: Days after the peak for the age factor to halve
+    """
+
+    def __init__(
+        self, keywords, patterns, weights, age_peak_days=14, age_half_life_days=30
+    ):
+        self.keywords = [keyword.lower() for keyword in keywords]
+        self.patterns = [pattern.lower() for pattern in patterns]
+        self.weights = np.array([weights[name] for name in FEATURES], dtype=np.float64)
+        self.age_peak_days = age_peak_days
+        self.age_half_life_days = age_half_life_days
+
+    def features(self, subjects, bodies, sent_timestamps, now=None):
+        """Build the (n, len(FEATURES)) feature matrix for a batch of candidates"""
+        subjects = [subject.lower() for subject in subjects]
+        bodies = [body.lower() for body in bodies]
+        now = time.time() if now is None else now
+        age_days = (now - np.asarray(sent_timestamps, dtype=np.float64)) / 86400
+        age_days = np.maximum(age_days, 0)
+
+        matrix = np.empty((len(subjects), len(FEATURES)), dtype=np.float64)
+        matrix[:, 0] = np.log1p(term_matrix(subjects, self.keywords).sum(axis=1))
+        matrix[:, 1] = np.log1p(term_matrix(bodies, self.keywords).sum(axis=1))
+        matrix[:, 2] = np.log1p(term_matrix(bodies, self.patterns).sum(axis=1))
+        matrix[:, 3] = np.minimum(age_days / self.age_peak_days, 1) * 0.5 ** (
+            np.maximum(age_days - self.age_peak_days, 0) / self.age_half_life_days
+        )
+        return matrix
+
+    def score(self, subjects, bodies, sent_timestamps, now=None):
+        """Return one score per candidate"""
+        return self.features(subjects, bodies, sent_timestamps, now) @ self.weights
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first"""
+    return heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
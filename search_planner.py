@@ -0,0 +1,110 @@
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class SearchPlanner:
+    """Split a Gmail search into date windows and list them concurrently.
+
+    Each window becomes an ``after:``/``before:`` query. A window whose listing
+    reaches ``shard_limit`` is assumed to hold more mail and is split in half
+    until it fits or reaches ``min_window_seconds``. Results are merged,
+    deduplicated and yielded in window order while later shards are still
+    being listed. Windows are listed in the order they are consumed and only
+    ``max_workers`` ahead of the consumer, so a run that stops early never
+    lists the windows it did not reach.
+    """
+
+    def __init__(
+        self,
+        gmail_service,
+        base_query,
+        start_date,
+        end_date=None,
+        shard_days=90,
+        max_workers=8,
+        shard_limit=500,
+        min_window_seconds=3600,
+    ):
+        self.gmail_service = gmail_service
+        self.base_query = base_query
+        self.start = int(start_date.timestamp())
+        self.end = int((end_date or datetime.now()).timestamp()) + 1
+        self.shard_seconds = max(int(shard_days * 86400), min_window_seconds)
+        self.max_workers = max_workers
+        self.shard_limit = shard_limit
+        self.min_window_seconds = min_window_seconds
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+
+    def plan(self):
+        """Return the initial (after, before) windows in chronological order"""
+        windows = []
+        window_start = self.start
+        while window_start < self.end:
+            window_end = min(window_start + self.shard_seconds, self.end)
+            windows.append((window_start, window_end))
+            window_start = window_end
+        return windows
+
+    def shard_query(self, window):
+        after, before = window
+        return f"{self.base_query} after:{after} before:{before}"
+
+    def _list_window(self, window):
+        """List one window; returns (message IDs, None) or (None, its two halves)"""
+        ids = self.gmail_service.list_message_ids(
+            self.shard_query(window), max_results=self.shard_limit
+        )
+        after, before = window
+        if len(ids) >= self.shard_limit and before - after > self.min_window_seconds:
+            middle = after + (before - after) // 2
+            self.logger.debug(
+                f"Window {after}-{before} is dense ({len(ids)}+ messages), splitting"
+            )
+            return None, [(after, middle), (middle, before)]
+        if len(ids) >= self.shard_limit:
+            self.logger.warning(
+                f"Window {after}-{before} still holds {len(ids)}+ messages at the minimum window size"
+            )
+        return ids, None
+
+    def iter_messages(self, max_results=None, newest_first=True):
+        """Yield message stubs from every window without duplicates"""
+        windows = self.plan()
+        self.logger.info(
+            f"Listing {len(windows)} date windows with {self.max_workers} workers"
+        )
+        seen = set()
+        # Windows waiting to be listed and futures in flight, both in consumption order
+        waiting = deque(reversed(windows) if newest_first else windows)
+        pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while waiting or pending:
+                while waiting and len(pending) < self.max_workers:
+                    pending.append(
+                        self._executor.submit(self._list_window, waiting.popleft())
+                    )
+                result, halves = pending.popleft().result()
+                if halves:
+                    # The window was split; its halves take its place in the order
+                    if newest_first:
+                        halves.reverse()
+                    pending.extendleft(
+                        self._executor.submit(self._list_window, half)
+                        for half in reversed(halves)
+                    )
+                    continue
+                # Gmail lists each window newest first
+                for message_id in result if newest_first else reversed(result):
+                    if message_id in seen:
+                        continue
+                    seen.add(message_id)
+                    yield {"id": message_id}
+                    if max_results is not None and len(seen) >= max_results:
+                        return
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self.logger.info(f"Sharded search produced {len(seen)} unique messages")
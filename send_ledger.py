@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+from address_utils import address_domain
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sends (
+    id INTEGER PRIMARY KEY,
+    recipient TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    subject_hash TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    message_id TEXT,
+    draft_id TEXT
+);
+CREATE INDEX IF NOT EXISTS sends_recipient ON sends (recipient, sent_at);
+CREATE INDEX IF NOT EXISTS sends_domain ON sends (domain, sent_at);
+CREATE TABLE IF NOT EXISTS recipient_stats (
+    recipient TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0,
+    last_sent_at REAL,
+    last_drafted_at REAL
+);
+"""
+
+
+def subject_hash(subject):
+    """Stable short hash of a subject, ignoring case and surrounding whitespace"""
+    return hashlib.sha256(subject.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+
+class SendLedger:
+    """Local SQLite record of every resend sent or drafted.
+
+    Each write appends a row (recipient, domain, subject hash, time, message
+    or draft ID) and updates a per-recipient summary row, so "how often and
+    when was X last contacted" is a single primary-key lookup and cooldowns
+    need no API calls. Addresses first seen by the ledger have their count
+    seeded once from a fallback such as a Gmail sent-folder search. Drafts
+    are logged but only sent messages count toward the per-recipient total.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def _stats_row(self, recipient):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT count, last_sent_at, last_drafted_at FROM recipient_stats "
+                "WHERE recipient = ?",
+                (recipient,),
+            ).fetchone()
+
+    def recipient_count(self, recipient, fallback):
+        """Return how many times recipient was emailed, seeding it from fallback() once"""
+        row = self._stats_row(recipient)
+        if row:
+            return row[0]
+        count = fallback()
+        with self._lock:
+            # Another process may have seeded the count first; its value wins
+            self._connection.execute(
+                "INSERT OR IGNORE INTO recipient_stats (recipient, count) VALUES (?, ?)",
+                (recipient, count),
+            )
+        return self._stats_row(recipient)[0]
+
+    def known_count(self, recipient):
+        """Return the recorded count, or None if the recipient has not been seeded"""
+        row = self._stats_row(recipient)
+        return row[0] if row else None
+
+    def last_contacted(self, recipient):
+        """Time of the latest send or draft to recipient, or None"""
+        row = self._stats_row(recipient)
+        if not row:
+            return None
+        times = [t for t in row[1:] if t is not None]
+        return max(times) if times else None
+
+    def in_cooldown(self, recipient, days, now=None):
+        """True if recipient was sent or drafted a resend within the last `days` days"""
+        last = self.last_contacted(recipient)
+        if last is None or days <= 0:
+            return False
+        now = time.time() if now is None else now
+        return now - last < days * 86400
+
+    def record(self, recipient, subject, response=None, is_draft=False):
+        """Log a successful send or draft; response is the Gmail API result if any"""
+        response = response or {}
+        if "draft_id" in response:
+            # send_scheduled_message result
+            draft_id, message_id = response["draft_id"], response.get("message_id")
+        elif is_draft:
+            draft_id = response.get("id")
+            message_id = response.get("message", {}).get("id")
+        else:
+            draft_id, message_id = None, response.get("id")
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute(
+                    "INSERT INTO sends (recipient, domain, subject_hash, kind, sent_at, "
+                    "message_id, draft_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        recipient,
+                        address_domain(recipient),
+                        subject_hash(subject),
+                        "draft" if is_draft else "sent",
+                        now,
+                        message_id,
+                        draft_id,
+                    ),
+                )
+                if is_draft:
+                    cursor.execute(
+                        "INSERT INTO recipient_stats (recipient, last_drafted_at) "
+                        "VALUES (?, ?) ON CONFLICT(recipient) DO UPDATE SET "
+                        "last_drafted_at = excluded.last_drafted_at",
+                        (recipient, now),
+                    )
+                else:
+                    cursor.execute(
+                        "INSERT INTO recipient_stats (recipient, count, last_sent_at) "
+                        "VALUES (?, 1, ?) ON CONFLICT(recipient) DO UPDATE SET "
+                        "count = count + 1, last_sent_at = excluded.last_sent_at",
+                        (recipient, now),
+                    )
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DomainSendScheduler:
+    """Spread sends across recipient domains while keeping each domain slow.
+
+    Jobs are queued per domain. A dispatcher thread rotates round-robin over
+    the domains and starts a job only when its domain is below its concurrency
+    limit and its minimum interval since the last start has passed, so overall
+    throughput stays high while no single company receives a burst.
+
+    Args:
+        run_job: Called on a worker thread with each job; returns its result
+        on_complete: Called with (job, result, error) once a job finishes
+        min_interval: Seconds between starts of two jobs for the same domain
+        per_domain_concurrency: Jobs for one domain allowed in flight at once
+        max_workers: Jobs allowed in flight across all domains
+        max_pending: Queued jobs at which submit blocks until one starts;
+            None for no limit
+    """
+
+    def __init__(
+        self,
+        run_job,
+        on_complete,
+        min_interval=30.0,
+        per_domain_concurrency=1,
+        max_workers=4,
+        max_pending=None,
+    ):
+        self.run_job = run_job
+        self.on_complete = on_complete
+        self.min_interval = min_interval
+        self.per_domain_concurrency = per_domain_concurrency
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.logger = logging.getLogger(__name__)
+        self._queues = OrderedDict()
+        self._in_flight = {}
+        self._next_start = {}
+        self._total_in_flight = 0
+        self._closing = False
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, domain, job):
+        """Queue a job for domain, waiting while max_pending jobs are queued"""
+        with self._condition:
+            while self.max_pending and self.pending() >= self.max_pending:
+                self._condition.wait()
+            if domain not in self._queues:
+                self._queues[domain] = deque()
+                self._in_flight.setdefault(domain, 0)
+            self._queues[domain].append(job)
+            self._condition.notify_all()
+
+    def pending(self):
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _next_ready(self, now):
+        """Pick the next domain in rotation that may start a job, or the time to wait"""
+        wait = None
+        for domain, queue in self._queues.items():
+            if not queue or self._in_flight[domain] >= self.per_domain_concurrency:
+                continue
+            ready_at = self._next_start.get(domain, 0)
+            if ready_at <= now:
+                return domain, None
+            wait = ready_at - now if wait is None else min(wait, ready_at - now)
+        return None, wait
+
+    def _dispatch_loop(self):
+        with self._condition:
+            while True:
+                if self._closing and not self.pending() and not self._total_in_flight:
+                    return
+                domain, wait = None, None
+                if self._total_in_flight < self.max_workers:
+                    domain, wait = self._next_ready(time.monotonic())
+                if domain is None:
+                    self._condition.wait(timeout=wait)
+                    continue
+                job = self._queues[domain].popleft()
+                # Move the domain to the back of the rotation
+                self._queues.move_to_end(domain)
+                if not self._queues[domain]:
+                    del self._queues[domain]
+                self._in_flight[domain] += 1
+                self._total_in_flight += 1
+                self._next_start[domain] = time.monotonic() + self.min_interval
+                self._executor.submit(self._run, domain, job)
+                # Wake submitters waiting for room in the queue
+                self._condition.notify_all()
+
+    def _run(self, domain, job):
+        result, error = None, None
+        try:
+            result = self.run_job(job)
+        except Exception as e:
+            error = e
+            self.logger.error(f"Scheduled send to {domain} failed: {e}")
+        try:
+            self.on_complete(job, result, error)
+        finally:
+            with self._condition:
+                self._in_flight[domain] -= 1
+                self._total_in_flight -= 1
+                self._condition.notify_all()
+
+    def close(self):
+        """Wait until every queued job has run, then stop the workers"""
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,62 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import Request
+
+
+class ThreadLocalTransport:
+    """Give each thread its own authorized HTTP client over shared credentials.
+
+    httplib2.Http is not thread-safe, so every worker thread gets a private
+    client that keeps its connections alive between requests. The credentials
+    are shared and refreshed ahead of expiry under a lock, so concurrent
+    requests neither race on refresh nor stall on a mid-run 401.
+    """
+
+    def __init__(
+        self, credentials, refresh_margin_seconds=300, timeout=None, on_refresh=None
+    ):
+        self.credentials = credentials
+        self.refresh_margin = timedelta(seconds=refresh_margin_seconds)
+        self.timeout = timeout
+        self.on_refresh = on_refresh
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def http(self):
+        """Return the calling thread's authorized HTTP client"""
+        self.ensure_fresh()
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials, http=httplib2.Http(timeout=self.timeout)
+            )
+            self._local.http = http
+        return http
+
+    def needs_refresh(self):
+        """Whether the access token is missing or within refresh_margin of expiry"""
+        if not self.credentials.token:
+            return True
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return False
+        # google-auth stores expiry as a naive UTC datetime
+        return expiry - datetime.utcnow() < self.refresh_margin
+
+    def ensure_fresh(self):
+        """Refresh the shared credentials once if they are close to expiring"""
+        if not self.needs_refresh():
+            return
+        with self._lock:
+            # Another thread may have refreshed while this one waited
+            if not self.needs_refresh():
+                return
+            self.logger.info("Refreshing access token ahead of expiry...")
+            self.credentials.refresh(Request())
+            if self.on_refresh:
+                self.on_refresh(self.credentials)
@@ -0,0 +1,309 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    message_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS messages_status ON messages (status, lease_expires);
+CREATE TABLE IF NOT EXISTS recipient_claims (
+    recipient TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    message_id TEXT,
+    lease_expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recipient_counts (
+    recipient TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resends (
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    PRIMARY KEY (recipient, subject)
+);
+CREATE TABLE IF NOT EXISTS excluded (
+    recipient TEXT PRIMARY KEY
+);
+"""
+
+
+class WorkQueue:
+    """SQLite work queue that lets several processes on one machine share a run.
+
+    Message IDs are leased in batches and the leases are kept alive by a
+    heartbeat thread; a worker that dies simply lets its leases expire so
+    another worker picks the messages up. Before emailing an address a worker
+    must claim it, which atomically checks the shared exclusion list,
+    per-recipient count and already-resent subjects, so two workers can never
+    email the same address at once. The database is opened in WAL mode,
+    which does not work over network filesystems, so it must be on local disk.
+
+    A run lasts until no message is left to process. Messages whose writes
+    failed are leased again until they have been tried max_attempts times,
+    and the first enqueue after a run has ended clears its state, so the
+    next run starts from fresh Gmail counts and retries every message.
+    """
+
+    def __init__(self, path, lease_seconds=300, worker_id=None, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = (
+            worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_thread = None
+
+    def _transaction(self, work):
+        """Run work(cursor) inside a write transaction taken up front"""
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(cursor)
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            return result
+
+    def enqueue(self, message_ids):
+        """Add message IDs that are not already queued; returns how many were new
+
+        If the previous run has ended, its messages, counts, claims, resends and
+        exclusions are cleared first and a new run starts.
+        """
+        rows = [(message_id,) for message_id in message_ids]
+
+        def work(cursor):
+            # Live leases and anything lease() would still hand out keep the run open
+            active = cursor.execute(
+                "SELECT 1 FROM messages WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_expires >= ?) "
+                "OR (status IN ('leased', 'failed') AND attempts < ?) LIMIT 1",
+                (time.time(), self.max_attempts),
+            ).fetchone()
+            if not active:
+                for table in (
+                    "messages",
+                    "recipient_claims",
+                    "recipient_counts",
+                    "resends",
+                    "excluded",
+                ):
+                    cursor.execute(f"DELETE FROM {table}")
+            added = cursor.executemany(
+                "INSERT OR IGNORE INTO messages (message_id) VALUES (?)", rows
+            ).rowcount
+            return added, not active
+
+        added, new_run = self._transaction(work)
+        if new_run:
+            self.logger.info(f"Started a new run in {self.path}")
+        return added
+
+    def seed_exclusions(self, emails):
+        rows = [(email,) for email in emails]
+        self._transaction(
+            lambda cursor: cursor.executemany(
+                "INSERT OR IGNORE INTO excluded (recipient) VALUES (?)", rows
+            )
+        )
+
+    def add_exclusion(self, recipient):
+        self._transaction(
+            lambda cursor: cursor.execute(
+                "INSERT OR IGNORE INTO excluded (recipient) VALUES (?)", (recipient,)
+            )
+        )
+
+    def lease(self, batch_size):
+        """Lease up to batch_size pending, expired or failed messages to this worker
+
+        Expired and failed messages are only retried while they have been
+        leased fewer than max_attempts times.
+        """
+
+        def work(cursor):
+            now = time.time()
+            ids = [
+                row[0]
+                for row in cursor.execute(
+                    "SELECT message_id FROM messages WHERE status = 'pending' "
+                    "OR (status IN ('leased', 'failed') AND attempts < ? "
+                    "AND COALESCE(lease_expires, 0) < ?) LIMIT ?",
+                    (self.max_attempts, now, batch_size),
+                )
+            ]
+            cursor.executemany(
+                "UPDATE messages SET status = 'leased', owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE message_id = ?",
+                [(self.worker_id, now + self.lease_seconds, i) for i in ids],
+            )
+            return ids
+
+        return self._transaction(work)
+
+    def complete(self, message_id, failed=False):
+        """Mark a leased message as done (or failed) so no worker takes it again"""
+        self._transaction(
+            lambda cursor: cursor.execute(
+                "UPDATE messages SET status = ?, lease_expires = NULL "
+                "WHERE message_id = ? AND owner = ?",
+                ("failed" if failed else "done", message_id, self.worker_id),
+            )
+        )
+
+    def iter_messages(self, batch_size=20):
+        """Yield message stubs leased to this worker until the queue is drained"""
+        while True:
+            ids = self.lease(batch_size)
+            if not ids:
+                return
+            for message_id in ids:
+                yield {"id": message_id}
+
+    def recipient_count(self, recipient, fallback):
+        """Return the shared send count for recipient, seeding it from fallback() once"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT count FROM recipient_counts WHERE recipient = ?", (recipient,)
+            ).fetchone()
+        if row:
+            return row[0]
+        count = fallback()
+
+        def work(cursor):
+            # Another worker may have seeded the count first; its value wins
+            cursor.execute(
+                "INSERT OR IGNORE INTO recipient_counts (recipient, count) VALUES (?, ?)",
+                (recipient, count),
+            )
+            return cursor.execute(
+                "SELECT count FROM recipient_counts WHERE recipient = ?", (recipient,)
+            ).fetchone()[0]
+
+        return self._transaction(work)
+
+    def claim_recipient(self, recipient, subject, message_id, max_count):
+        """Atomically reserve recipient for this worker; returns None or the reason it was refused"""
+
+        def work(cursor):
+            now = time.time()
+            if cursor.execute(
+                "SELECT 1 FROM excluded WHERE recipient = ?", (recipient,)
+            ).fetchone():
+                return "excluded"
+            if cursor.execute(
+                "SELECT 1 FROM resends WHERE recipient = ? AND subject = ?",
+                (recipient, subject),
+            ).fetchone():
+                return "already resent"
+            row = cursor.execute(
+                "SELECT count FROM recipient_counts WHERE recipient = ?", (recipient,)
+            ).fetchone()
+            if row and row[0] >= max_count:
+                return "recipient limit reached"
+            claim = cursor.execute(
+                "SELECT owner, lease_expires FROM recipient_claims WHERE recipient = ?",
+                (recipient,),
+            ).fetchone()
+            if claim and claim[0] != self.worker_id and claim[1] >= now:
+                return f"claimed by {claim[0]}"
+            cursor.execute(
+                "INSERT OR REPLACE INTO recipient_claims "
+                "(recipient, owner, message_id, lease_expires) VALUES (?, ?, ?, ?)",
+                (recipient, self.worker_id, message_id, now + self.lease_seconds),
+            )
+            return None
+
+        return self._transaction(work)
+
+    def finish_recipient(self, recipient, subject, sent, exclude=False):
+        """Release a claim, recording the send and exclusion in the same transaction"""
+
+        def work(cursor):
+            if sent:
+                cursor.execute(
+                    "INSERT INTO recipient_counts (recipient, count) VALUES (?, 1) "
+                    "ON CONFLICT(recipient) DO UPDATE SET count = count + 1",
+                    (recipient,),
+                )
+                cursor.execute(
+                    "INSERT OR IGNORE INTO resends (recipient, subject) VALUES (?, ?)",
+                    (recipient, subject),
+                )
+                if exclude:
+                    cursor.execute(
+                        "INSERT OR IGNORE INTO excluded (recipient) VALUES (?)",
+                        (recipient,),
+                    )
+            cursor.execute(
+                "DELETE FROM recipient_claims WHERE recipient = ? AND owner = ?",
+                (recipient, self.worker_id),
+            )
+
+        self._transaction(work)
+
+    def heartbeat(self):
+        """Extend every lease and claim this worker holds"""
+        expires = time.time() + self.lease_seconds
+
+        def work(cursor):
+            cursor.execute(
+                "UPDATE messages SET lease_expires = ? WHERE owner = ? AND status = 'leased'",
+                (expires, self.worker_id),
+            )
+            cursor.execute(
+                "UPDATE recipient_claims SET lease_expires = ? WHERE owner = ?",
+                (expires, self.worker_id),
+            )
+
+        self._transaction(work)
+
+    def start_heartbeat(self):
+        def beat():
+            while not self._heartbeat_stop.wait(self.lease_seconds / 3):
+                try:
+                    self.heartbeat()
+                except sqlite3.Error as e:
+                    self.logger.error(f"Work queue heartbeat failed: {e}")
+
+        self._heartbeat_thread = threading.Thread(target=beat, daemon=True)
+        self._heartbeat_thread.start()
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._connection.execute(
+                    "SELECT status, COUNT(*) FROM messages GROUP BY status"
+                ).fetchall()
+            )
+
+    def close(self):
+        """Stop the heartbeat and give up any recipient claims still held"""
+        self._heartbeat_stop.set()
+        if self._heartbeat_thread:
+            self._heartbeat_thread.join()
+        self._transaction(
+            lambda cursor: cursor.execute(
+                "DELETE FROM recipient_claims WHERE owner = ?", (self.worker_id,)
+            )
+        )
+        self._connection.close()